@@ -0,0 +1,61 @@
+import argparse
+import threading
+import time
+
+from quote_cache import QuoteCache
+
+# 模拟多个使用方同时读取同一批股票，上游请求耗时 latency 秒
+# 对比不使用缓存与使用缓存时的上游请求次数和单次读取耗时
+
+class FakeUpstream:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, keys):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return {key: {'secid': key, 'latest_price': 1467.2} for key in keys}
+
+def run(consumers, reads, keys, upstream, cache, period):
+    """每个使用方每隔 period 秒读取一次全部股票，返回单次读取的平均耗时"""
+    durations = []
+    lock = threading.Lock()
+
+    def consumer():
+        for _ in range(reads):
+            start = time.perf_counter()
+            if cache is None:
+                upstream.fetch(keys)
+            else:
+                cache.get_many(keys, upstream.fetch)
+            elapsed = time.perf_counter() - start
+            with lock:
+                durations.append(elapsed)
+            time.sleep(period)
+
+    threads = [threading.Thread(target=consumer) for _ in range(consumers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(durations) / len(durations)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="行情缓存基准测试")
+    parser.add_argument('--consumers', type=int, default=20, help="同时读取的使用方数量")
+    parser.add_argument('--reads', type=int, default=20, help="每个使用方的读取次数")
+    parser.add_argument('--latency', type=float, default=0.2, help="模拟的上游请求耗时（秒）")
+    parser.add_argument('--period', type=float, default=0.1, help="每个使用方两次读取的间隔（秒）")
+    parser.add_argument('--ttl', type=float, default=1.0)
+    args = parser.parse_args()
+
+    keys = [f"1.60{i:04d}" for i in range(10)]
+    for name, cache in (('无缓存', None), ('缓存', QuoteCache(ttl=args.ttl, stale_ttl=args.ttl * 5))):
+        upstream = FakeUpstream(args.latency)
+        average = run(args.consumers, args.reads, keys, upstream, cache, args.period)
+        print(f"{name}: 上游请求 {upstream.calls} 次，单次读取平均 {average * 1000:.1f} ms")
+        if cache is not None:
+            print(f"缓存统计: {cache.stats()}")
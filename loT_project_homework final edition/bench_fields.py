@@ -0,0 +1,68 @@
+import argparse
+import json
+import time
+
+from publish import MaotaiFuturesSpider, LEGACY_FIELDS, LIST_FIELD_PROFILES, build_fields
+
+# 对比原完整字段请求与字段投影后请求的响应体积和解析耗时
+# 发布循环总是走批量接口 ulist.np/get，这里按相同的参数请求一批股票，耗时包含 JSON 解码和逐只解析
+
+DEFAULT_SECIDS = ['1.600519', '0.000858', '1.601318', '0.000001', '1.600036', '0.300750', '1.600276', '0.002594']
+
+def fetch_payload(spider, fields, secids):
+    """按指定字段请求一次批量接口，返回原始响应字节"""
+    params = {
+        'secids': ','.join(secids),
+        'fields': fields,
+        'invt': '2',
+        'fltt': '2',
+        'np': '1',
+        '_': int(time.time() * 1000)
+    }
+    response = spider.session.get(spider.list_api_url, headers=spider.headers, params=params, timeout=10)
+    response.raise_for_status()
+    return response.content
+
+def fake_payload(fields, secids):
+    """离线模式：按字段列表构造与批量接口结构相同的响应"""
+    diff = []
+    for secid in secids:
+        market, code = secid.split('.')
+        item = {field: 12345.67 for field in fields.split(',')}
+        item.update({'f12': code, 'f13': int(market), 'f14': '贵州茅台'})
+        diff.append(item)
+    return json.dumps({'rc': 0, 'rt': 6, 'svr': 0, 'lt': 1, 'full': 1,
+                       'data': {'total': len(diff), 'diff': diff}}, ensure_ascii=False).encode('utf-8')
+
+def time_parse(spider, payload, repeat):
+    """重复解码并解析，返回单次平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        spider.parse_list_response(payload, 0)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="字段投影基准测试")
+    parser.add_argument('--offline', action='store_true', help="不访问网络，使用构造的响应")
+    parser.add_argument('--repeat', type=int, default=2000, help="解析重复次数")
+    parser.add_argument('secids', nargs='*', default=DEFAULT_SECIDS, help="一批请求的股票")
+    args = parser.parse_args()
+
+    spider = MaotaiFuturesSpider()
+    cases = [('legacy', LEGACY_FIELDS)]
+    for name in LIST_FIELD_PROFILES:
+        profiles = ('basic',) if name == 'basic' else ('basic', name)
+        cases.append(('+'.join(profiles), build_fields(profiles, LIST_FIELD_PROFILES)))
+
+    results = []
+    for name, fields in cases:
+        # 基础档位以外的字段只在启用时解析，与实际发布时一致
+        spider.profiles = tuple(name.split('+')) if name != 'legacy' else tuple(LIST_FIELD_PROFILES)
+        payload = fake_payload(fields, args.secids) if args.offline else fetch_payload(spider, fields, args.secids)
+        results.append((name, len(fields.split(',')), len(payload), time_parse(spider, payload, args.repeat)))
+
+    print(f"{len(args.secids)} 只股票一批，批量接口 ulist.np/get")
+    base_bytes, base_us = results[0][2], results[0][3]
+    print(f"{'profile':<20}{'fields':>8}{'bytes':>10}{'parse(us)':>12}{'bytes%':>9}{'time%':>8}")
+    for name, count, size, us in results:
+        print(f"{name:<20}{count:>8}{size:>10}{us:>12.2f}{size / base_bytes:>9.0%}{us / base_us:>8.0%}")
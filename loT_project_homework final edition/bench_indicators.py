@@ -0,0 +1,102 @@
+import argparse
+import math
+import random
+import statistics
+import time
+
+import numpy as np
+
+from indicators import IndicatorEngine
+
+# 对比环形缓冲区增量更新与每个 tick 都从 Python 列表重新计算指标的耗时
+# 模拟一次抓取返回 symbols 只股票、共 rounds 轮，每轮两种方式都算出全部股票的 SMA/EMA/标准差/VWAP
+
+def make_ticks(symbols, rounds):
+    """生成 rounds 轮行情，每轮是 (价格列表, 累计成交量列表)"""
+    prices = [random.uniform(10, 2000) for _ in range(symbols)]
+    volumes = [0] * symbols
+    ticks = []
+    for _ in range(rounds):
+        prices = [round(p * (1 + random.gauss(0, 0.001)), 2) for p in prices]
+        volumes = [v + random.randint(0, 500) for v in volumes]
+        ticks.append((prices, volumes))
+    return ticks
+
+class ListRecompute:
+    """对照组：保存全部历史，每个 tick 取最近 window 个值重新计算"""
+
+    def __init__(self, window):
+        self.window = window
+        self.alpha = 2 / (window + 1)
+        self.history = {}
+        self.ema = {}
+        self.last_volume = {}
+
+    def update(self, key, price, volume):
+        prices, dvs = self.history.setdefault(key, ([], []))
+        last = self.last_volume.get(key)
+        self.last_volume[key] = volume
+        prices.append(price)
+        dvs.append(0 if last is None else volume - last)
+        ema = self.ema.get(key)
+        self.ema[key] = price if ema is None else ema + self.alpha * (price - ema)
+
+        recent, recent_dv = prices[-self.window:], dvs[-self.window:]
+        sma = sum(recent) / len(recent)
+        std = statistics.stdev(recent) if len(recent) > 1 else 0.0
+        total_dv = sum(recent_dv)
+        vwap = sum(p * v for p, v in zip(recent, recent_dv)) / total_dv if total_dv else None
+        return sma, self.ema[key], std, vwap
+
+def run_list(ticks, keys, window):
+    calc = ListRecompute(window)
+    start = time.perf_counter()
+    for prices, volumes in ticks:
+        last = [calc.update(key, p, v) for key, p, v in zip(keys, prices, volumes)]
+    return last, time.perf_counter() - start
+
+def check_suspended(window):
+    """停牌的行情（批量接口返回 '-'）经过发布者时不改变指标状态"""
+    from publish import MaotaiFuturesSpider
+
+    spider = MaotaiFuturesSpider(indicators=IndicatorEngine(window=window))
+    spider.send = lambda topic, payload: None
+    trading = {'f12': '600519', 'f13': 1, 'f14': '贵州茅台', 'f2': 1467.2, 'f4': -12.3, 'f3': -0.84}
+    suspended = dict(trading, f2='-', f4='-', f3='-')
+    spider.publish_indicators([spider.parse_list_item(trading)])
+    key = spider.indicator_topic_for(spider.parse_list_item(trading))
+    before = spider.indicators.snapshot(key)
+    spider.publish_indicators([spider.parse_list_item(suspended)])
+    assert spider.indicators.snapshot(key) == before, (before, spider.indicators.snapshot(key))
+
+def run_engine(ticks, keys, window):
+    engine = IndicatorEngine(window=window)
+    start = time.perf_counter()
+    for prices, volumes in ticks:
+        rows = engine.update(keys, prices, volumes)
+        last = engine.values(rows)
+    return last, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="指标计算基准测试")
+    parser.add_argument('--rounds', type=int, default=500, help="抓取轮数")
+    parser.add_argument('--window', type=int, default=20, help="滚动窗口长度")
+    args = parser.parse_args()
+
+    random.seed(0)
+    check_suspended(args.window)
+    print(f"{'symbols':>8}{'list(ms)':>12}{'numpy(ms)':>12}{'speedup':>9}{'max diff':>11}")
+    for symbols in (1, 10, 100, 1000):
+        ticks = make_ticks(symbols, args.rounds)
+        keys = [f"sym{i}" for i in range(symbols)]
+        expected, list_time = run_list(ticks, keys, args.window)
+        (sma, ema, std, vwap, _), numpy_time = run_engine(ticks, keys, args.window)
+        # 两种算法的结果应一致，只差浮点误差
+        diff = max(max(abs(a - b) for a, b in zip(row[:3], (sma[i], ema[i], std[i])))
+                   for i, row in enumerate(expected))
+        diff = max(diff, max(abs(row[3] - vwap[i]) for i, row in enumerate(expected) if row[3] is not None))
+        assert not math.isnan(diff) and diff < 1e-6, diff
+        per_round = 1000 / args.rounds
+        print(f"{symbols:>8}{list_time * per_round:>12.3f}{numpy_time * per_round:>12.3f}"
+              f"{list_time / numpy_time:>8.1f}x{diff:>11.1e}")
+    print("耗时为每轮（一次抓取）更新全部股票的平均值")
@@ -0,0 +1,55 @@
+import argparse
+import io
+import json
+import time
+import tracemalloc
+
+from json_stream import extract
+
+# 对比整体读取后 json.loads 与流式字段提取的峰值内存和耗时
+# 在 CPython 上用 tracemalloc 统计，绝对值与设备不同，但能反映两者的相对差距
+
+KEYS = ("current_price", "future_price")
+
+def make_payload(history):
+    """构造与价格接口类似的响应，附带一段历史数据让文档变大"""
+    doc = {
+        "symbol": "600519",
+        "name": "贵州茅台",
+        "history": [{"t": 1700000000 + i * 60, "p": 1467.2 + i / 100} for i in range(history)],
+        "current_price": 1467.2,
+        "future_price": 1480.5,
+    }
+    return json.dumps(doc, ensure_ascii=False).encode('utf-8')
+
+def with_json_loads(payload):
+    stream = io.BytesIO(payload)
+    data = json.loads(stream.read())
+    return {key: data.get(key) for key in KEYS}
+
+def with_stream(payload):
+    return extract(io.BytesIO(payload).read, KEYS, 64)
+
+def measure(func, payload, repeat):
+    """返回 (峰值内存字节, 单次平均耗时微秒)"""
+    tracemalloc.start()
+    result = func(payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert result == {"current_price": 1467.2, "future_price": 1480.5}, result
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    return peak, (time.perf_counter() - start) / repeat * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式 JSON 提取基准测试")
+    parser.add_argument('--repeat', type=int, default=200, help="计时重复次数")
+    args = parser.parse_args()
+
+    print(f"{'history':>8}{'bytes':>9}{'method':>12}{'peak(B)':>10}{'time(us)':>11}")
+    for history in (0, 10, 100, 500):
+        payload = make_payload(history)
+        for name, func in (('json.loads', with_json_loads), ('stream', with_stream)):
+            peak, us = measure(func, payload, args.repeat)
+            print(f"{history:>8}{len(payload):>9}{name:>12}{peak:>10}{us:>11.1f}")
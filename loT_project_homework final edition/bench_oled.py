@@ -0,0 +1,141 @@
+import host_sim
+host_sim.install()
+
+import time
+
+import ssd1306
+from machine import I2C, SPI, Pin
+from panel import SSD1306Panel
+
+# 用模拟总线统计 OLED 驱动的传输次数、字节数和按总线速率估算的刷新耗时
+# 总线上挂接模拟屏幕，每种驱动结束时都检查屏幕内容与帧缓冲一致
+# I2C: 对比逐字节发送命令与批量发送命令
+# SPI: 对比每次传输都重新初始化总线、新建命令缓冲区的旧实现与预分配实现
+
+class LegacySSD1306_I2C(ssd1306.SSD1306_I2C):
+    """每条命令单独一次传输的旧行为，作为对照"""
+
+    def write_cmds(self, cmds, n):
+        ssd1306.SSD1306.write_cmds(self, cmds, n)
+
+class LegacySSD1306_SPI(ssd1306.SSD1306_SPI):
+    """每条命令都 init 总线并新建 bytearray 的旧行为，作为对照"""
+
+    def write_cmd(self, cmd):
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cs.high()
+        self.dc.low()
+        self.cs.low()
+        self.spi.write(bytearray([cmd]))
+        self.cs.high()
+
+    def write_cmds(self, cmds, n):
+        ssd1306.SSD1306.write_cmds(self, cmds, n)
+
+    def write_data(self, buf):
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cs.high()
+        self.dc.high()
+        self.cs.low()
+        self.spi.write(buf)
+        self.cs.high()
+
+class CountingSPI(SPI):
+    """额外统计写入了多少个不同的缓冲区对象，即发送路径上的内存分配次数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buffers = {}  # 保留引用，避免对象被回收后 id 被复用
+
+    def write(self, buf):
+        super().write(buf)
+        self.buffers[id(buf)] = buf
+
+    def reset(self):
+        super().reset()
+        self.buffers = {}
+
+    def stats(self):
+        stats = super().stats()
+        stats['allocations'] = len(self.buffers)
+        return stats
+
+def i2c_stats(i2c):
+    """总线统计加上 100kHz 与 400kHz 下的估算耗时"""
+    stats = i2c.stats()
+    stats['ms_100k'] = i2c.bus_time(100000) * 1000
+    stats['ms_400k'] = i2c.bus_time(400000) * 1000
+    return stats
+
+def run(cls):
+    """依次测量初始化、整屏刷新和单行刷新的总线开销"""
+    i2c = I2C(0)
+    panel = SSD1306Panel()
+    i2c.attach(panel)
+    results = []
+    oled = cls(128, 64, i2c)
+    results.append(('init_display', i2c_stats(i2c)))
+    i2c.reset()
+    oled.fill(0)
+    oled.text("Maotai Price:", 10, 10)
+    oled.text("CP: 1467.20", 10, 40)
+    oled.show()
+    results.append(('full redraw', i2c_stats(i2c)))
+    i2c.reset()
+    oled.text("CP: 1467.30", 10, 40)
+    oled.show()
+    results.append(('one line', i2c_stats(i2c)))
+    i2c.reset()
+    # main2.py 的写法：每次清屏后重画所有行，只有一位数字变化
+    oled.fill(0)
+    oled.text("Maotai Price:", 10, 10)
+    oled.text("CP: 1467.40", 10, 40)
+    oled.show()
+    results.append(('fill+redraw', i2c_stats(i2c)))
+    i2c.reset()
+    oled.contrast(0x80)
+    oled.invert(0)
+    results.append(('contrast+invert', i2c_stats(i2c)))
+    if panel.visible() != bytes(oled.data):
+        raise AssertionError(f"{cls.__name__}: 屏幕内容与帧缓冲不一致")
+    return results
+
+def run_spi(cls, frames=200):
+    """连续刷新多帧，统计 SPI 初始化次数、分配次数和单帧耗时"""
+    spi = CountingSPI(1)
+    panel = SSD1306Panel()
+    dc = Pin(16)
+    spi.attach(panel, dc)
+    oled = cls(128, 64, spi, dc=dc, res=Pin(17), cs=Pin(18))
+    spi.reset()
+    start = time.perf_counter()
+    for i in range(frames):
+        oled.fill(0)
+        oled.text("CP: %.2f" % (1467 + i / 100), 10, 40)
+        oled.show()
+        oled.contrast(0xff)
+    elapsed = time.perf_counter() - start
+    if panel.visible() != bytes(oled.data):
+        raise AssertionError(f"{cls.__name__}: 屏幕内容与帧缓冲不一致")
+    stats = spi.stats()
+    stats['us_per_frame'] = elapsed / frames * 1e6
+    return stats
+
+if __name__ == "__main__":
+    print(f"{'driver':<10}{'operation':<18}{'transactions':>14}{'bytes':>8}{'ms@100k':>10}{'ms@400k':>10}")
+    drivers = (
+        ('legacy', LegacySSD1306_I2C),
+        ('batched', ssd1306.SSD1306_I2C),
+        ('shadow', lambda *args: ssd1306.SSD1306_I2C(*args, double_buffer=True)),
+    )
+    for name, cls in drivers:
+        for operation, stats in run(cls):
+            print(f"{name:<10}{operation:<18}{stats['transactions']:>14}{stats['bytes']:>8}"
+                  f"{stats['ms_100k']:>10.2f}{stats['ms_400k']:>10.2f}")
+
+    print()
+    print(f"{'spi driver':<12}{'transactions':>14}{'inits':>8}{'allocations':>13}{'us/frame':>10}")
+    for name, cls in (('legacy', LegacySSD1306_SPI), ('prealloc', ssd1306.SSD1306_SPI)):
+        stats = run_spi(cls)
+        print(f"{name:<12}{stats['transactions']:>14}{stats['inits']:>8}{stats['allocations']:>13}"
+              f"{stats['us_per_frame']:>10.1f}")
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import paho.mqtt.client as mqtt
+
+from local_broker import Broker
+from payload_log import SOURCE_LIST, is_payload_log, read_log
+from publish import MaotaiFuturesSpider
+from sinks import CallbackSink
+from subscribe import QueuedSubscriber
+
+try:
+    import resource
+except ImportError:
+    # Windows 上没有 resource 模块，不统计内存
+    resource = None
+
+# 发布/订阅全链路基准测试：本地模拟的东方财富批量接口 + 本地 MQTT 代理 + 发布者 + 订阅者
+# 按股票数量和抓取频率逐级加压，每一级分别在新进程中运行发布者和订阅者，
+# 输出吞吐、CPU、内存峰值和延迟分位数的 JSON，可以与上一次的结果对比发现性能回退
+# 模拟接口重放录制的响应（--payloads），没有录制文件时用固定种子生成的随机游走数据，结果可复现
+
+LIST_PATH = '/api/qt/ulist.np/get'
+TOPIC = "sc104/maotai"
+# 录制的批量接口响应中的一只股票（fltt=2，价格为元）
+RECORDED_ITEM = {'f2': 1467.2, 'f3': -0.86, 'f4': -12.8, 'f5': 23456, 'f6': 3441234567.0,
+                 'f12': '600519', 'f13': 1, 'f14': '贵州茅台'}
+
+def load_frames(path):
+    """读取录制的批量接口响应，返回每帧的股票列表
+    支持 publish.py --record 录制的文件，或每行一个完整 JSON 响应体的文本文件"""
+    if is_payload_log(path):
+        bodies = (payload for source, _, payload in read_log(path) if source == SOURCE_LIST)
+    else:
+        with open(path, encoding='utf-8') as f:
+            bodies = [line for line in f if line.strip()]
+    frames = []
+    for body in bodies:
+        diff = (json.loads(body).get('data') or {}).get('diff') or []
+        if isinstance(diff, dict):
+            diff = list(diff.values())
+        if diff:
+            frames.append(diff)
+    if not frames:
+        raise ValueError(f"{path} 中没有可用的响应")
+    return frames
+
+def synthetic_frames(count=100, width=50, seed=1):
+    """以录制样本为起点生成随机游走的帧，固定种子保证每次运行的数据相同"""
+    rng = random.Random(seed)
+    prices = [RECORDED_ITEM['f2'] * rng.uniform(0.5, 1.5) for _ in range(width)]
+    frames = []
+    for _ in range(count):
+        frame = []
+        for i in range(width):
+            prices[i] = round(prices[i] * (1 + rng.gauss(0, 0.001)), 2)
+            frame.append(dict(RECORDED_ITEM, f2=prices[i], f3=round(rng.uniform(-3, 3), 2)))
+        frames.append(frame)
+    return frames
+
+def watchlist(count):
+    return [f"{1 if i % 2 == 0 else 0}.{600000 + i:06d}" for i in range(count)]
+
+def make_handler(frames):
+    """按请求的 secids 依次重放录制帧，股票代码改写为请求的代码"""
+    counter = [0]
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 与真实接口一样保持连接，避免每次请求重新建连
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path != LIST_PATH:
+                self.send_error(404)
+                return
+            secids = parse_qs(url.query).get('secids', [''])[0].split(',')
+            with lock:
+                frame = frames[counter[0] % len(frames)]
+                counter[0] += 1
+            diff = []
+            for i, secid in enumerate(filter(None, secids)):
+                market, _, code = secid.partition('.')
+                diff.append(dict(frame[i % len(frame)], f12=code, f13=int(market)))
+            body = json.dumps({'rc': 0, 'data': {'total': len(diff), 'diff': diff}},
+                              ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def run_infra(upstream_port, broker_port, frames, ready):
+    """模拟接口和 MQTT 代理运行在同一个独立进程中，不占用被测进程的 CPU"""
+    server = ThreadingHTTPServer(('127.0.0.1', upstream_port), make_handler(frames))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def main():
+        await Broker().start('127.0.0.1', broker_port)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+def rss_mb():
+    """进程的内存峰值（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda p: round(values[min(len(values) - 1, int(len(values) * p / 100))] * 1000, 2)
+    return {'p50': pick(50), 'p90': pick(90), 'p99': pick(99), 'max': round(values[-1] * 1000, 2)}
+
+def run_publisher(options, symbols, rate, duration, results):
+    """按 rate 轮/秒抓取并发布 symbols 只股票，运行 duration 秒"""
+    sys.stdout = open(os.devnull, 'w')  # 只有一只股票时每条消息都会打印
+    spider = MaotaiFuturesSpider(watchlist=watchlist(symbols), batch_size=options['batch_size'],
+                                 max_workers=options['workers'], binary=options['binary'],
+                                 broker='127.0.0.1', port=options['broker_port'])
+    spider.list_api_url = f"http://127.0.0.1:{options['upstream_port']}{LIST_PATH}"
+    spider.connect_mqtt()
+    period = 1 / rate
+    cycles = late = 0
+    cpu = time.process_time()
+    start = next_run = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        spider.publish_quotes(spider.get_all_quotes())
+        cycles += 1
+        next_run += period
+        delay = next_run - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # 一轮耗时超过周期，跟不上目标频率
+            late += 1
+            next_run = time.perf_counter()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    spider.disconnect_mqtt()
+    snapshot = spider.metrics.snapshot()
+    published = snapshot['counters'].get('messages_published', 0)
+    results.put({
+        'cycles': cycles,
+        'late_cycles': late,
+        'published': published,
+        'elapsed_s': round(elapsed, 3),
+        'msgs_per_s': round(published / elapsed, 1),
+        'cpu_percent': round(cpu / elapsed * 100, 1),
+        'rss_mb': rss_mb(),
+        'stages': snapshot['stages'],
+        'errors': snapshot['errors'],
+    })
+
+def run_subscriber(options, ready, done, results):
+    """订阅全部行情主题，处理完成时刻与行情中的时间戳之差即为延迟"""
+    publish_latency = []  # 发布 -> 订阅者处理完成
+    upstream_latency = []  # 上游响应到达 -> 订阅者处理完成
+
+    def collect(records):
+        now = time.time()
+        for record in records:
+            data = record['data']
+            if data.get('t_pub') is not None:
+                publish_latency.append(now - data['t_pub'])
+            if data.get('t_recv') is not None:
+                upstream_latency.append(now - data['t_recv'])
+
+    subscriber = QueuedSubscriber([CallbackSink(collect)], workers=options['sub_workers'],
+                                  batch_timeout=options['batch_timeout'])
+    client = mqtt.Client(client_id="bench-pipeline-subscriber")
+    client.on_message = subscriber.on_message
+    client.on_subscribe = lambda *a: ready.set()
+    client.on_connect = lambda c, u, f, rc: c.subscribe(TOPIC + "/#")
+    client.connect('127.0.0.1', options['broker_port'])
+    client.loop_start()
+    ready.wait(10)
+    cpu = time.process_time()
+    start = time.perf_counter()
+    done.wait()
+    # 发布者结束后等待在途消息处理完，连续一段时间没有新消息即认为结束
+    last = -1
+    while subscriber.received != last or subscriber.stats()['processed'] < subscriber.received:
+        last = subscriber.received
+        time.sleep(0.3)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    client.loop_stop()
+    subscriber.stop()
+    stats = subscriber.stats()
+    results.put({
+        'received': stats['received'],
+        'max_queue_depth': stats['max_depth'],
+        'errors': stats['errors'],
+        'cpu_percent': round(cpu / elapsed * 100, 1),
+        'rss_mb': rss_mb(),
+        'latency_ms': {
+            'publish_to_subscriber': percentiles(publish_latency),
+            'upstream_to_subscriber': percentiles(upstream_latency),
+        },
+    })
+
+def run_level(options, symbols, rate, duration):
+    """运行一级负载，发布者和订阅者都是新进程，互不影响 CPU 和内存统计"""
+    results = multiprocessing.Queue()
+    ready = multiprocessing.Event()
+    done = multiprocessing.Event()
+    subscriber = multiprocessing.Process(target=run_subscriber, args=(options, ready, done, results))
+    subscriber.start()
+    ready.wait(10)
+    publisher_results = multiprocessing.Queue()
+    publisher = multiprocessing.Process(target=run_publisher,
+                                        args=(options, symbols, rate, duration, publisher_results))
+    publisher.start()
+    publisher_stats = publisher_results.get()
+    publisher.join()
+    done.set()
+    subscriber_stats = results.get()
+    subscriber.join()
+    published = publisher_stats['published']
+    subscriber_stats['lost'] = published - subscriber_stats['received']
+    subscriber_stats['msgs_per_s'] = round(subscriber_stats['received'] / publisher_stats['elapsed_s'], 1)
+    return {
+        'symbols': symbols,
+        'rate': rate,
+        'target_msgs_per_s': symbols * rate * (2 if options['binary'] else 1),
+        'publisher': publisher_stats,
+        'subscriber': subscriber_stats,
+    }
+
+def compare(results, baseline, tolerance):
+    """与上一次的结果比较，返回退化项的说明列表"""
+    previous = {(r['symbols'], r['rate']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['symbols'], result['rate']))
+        if old is None:
+            continue
+        level = f"{result['symbols']} 只 x {result['rate']} 轮/秒"
+        new_rate, old_rate = result['subscriber']['msgs_per_s'], old['subscriber']['msgs_per_s']
+        if new_rate < old_rate * (1 - tolerance):
+            regressions.append(f"{level}: 吞吐 {old_rate} -> {new_rate} msgs/s")
+        new_p99 = (result['subscriber']['latency_ms']['upstream_to_subscriber'] or {}).get('p99')
+        old_p99 = (old['subscriber']['latency_ms']['upstream_to_subscriber'] or {}).get('p99')
+        if new_p99 is not None and old_p99 is not None and new_p99 > old_p99 * (1 + tolerance):
+            regressions.append(f"{level}: p99 延迟 {old_p99} -> {new_p99} ms")
+        if result['publisher']['cpu_percent'] > old['publisher']['cpu_percent'] * (1 + tolerance):
+            regressions.append(f"{level}: 发布者 CPU {old['publisher']['cpu_percent']}% -> "
+                               f"{result['publisher']['cpu_percent']}%")
+    return regressions
+
+def parse_list(value, kind):
+    return [kind(item) for item in value.split(',') if item]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="发布/订阅全链路基准测试")
+    parser.add_argument('--symbols', default='1,10,100,500', help="逐级的股票数量，逗号分隔")
+    parser.add_argument('--rates', default='1,5', help="逐级的抓取频率（轮/秒），逗号分隔")
+    parser.add_argument('--duration', type=float, default=5, help="每一级运行的秒数")
+    parser.add_argument('--payloads', help="录制的批量接口响应（--record 文件或 JSON Lines），默认使用生成的数据")
+    parser.add_argument('--seed', type=int, default=1, help="生成数据的随机种子")
+    parser.add_argument('--binary', action='store_true', help="同时发布二进制格式")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4, help="发布者的并发请求数")
+    parser.add_argument('--sub-workers', type=int, default=2, help="订阅者的工作线程数")
+    parser.add_argument('--batch-timeout', type=float, default=0.2, help="订阅者凑批等待的秒数")
+    parser.add_argument('--upstream-port', type=int, default=18480)
+    parser.add_argument('--broker-port', type=int, default=18883)
+    parser.add_argument('--output', help="结果写入文件，默认输出到标准输出")
+    parser.add_argument('--baseline', help="上一次的结果文件，吞吐、延迟或 CPU 退化超过容差时返回非零")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="与基准比较的相对容差")
+    args = parser.parse_args()
+
+    frames = load_frames(args.payloads) if args.payloads else synthetic_frames(seed=args.seed)
+    options = {
+        'upstream_port': args.upstream_port,
+        'broker_port': args.broker_port,
+        'batch_size': args.batch_size,
+        'workers': args.workers,
+        'sub_workers': args.sub_workers,
+        'batch_timeout': args.batch_timeout,
+        'binary': args.binary,
+    }
+    ready = multiprocessing.Event()
+    infra = multiprocessing.Process(target=run_infra, args=(args.upstream_port, args.broker_port, frames, ready),
+                                    daemon=True)
+    infra.start()
+    if not ready.wait(10):
+        sys.exit("模拟接口或本地代理启动失败")
+
+    results = []
+    for symbols in parse_list(args.symbols, int):
+        for rate in parse_list(args.rates, float):
+            result = run_level(options, symbols, rate, args.duration)
+            results.append(result)
+            print(f"{symbols} 只 x {rate} 轮/秒: 发布 {result['publisher']['msgs_per_s']} msgs/s，"
+                  f"收到 {result['subscriber']['msgs_per_s']} msgs/s，丢失 {result['subscriber']['lost']}",
+                  file=sys.stderr)
+    infra.terminate()
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'config': dict(options, duration=args.duration, payloads=args.payloads, seed=args.seed,
+                       frames=len(frames)),
+        'results': results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"性能退化: {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import multiprocessing
+import time
+from datetime import datetime
+
+from price_server import PATH, PriceCache, PriceServer
+
+# 价格接口压测：服务端在独立进程中运行，客户端用 asyncio 建立 clients 个 keep-alive 连接
+# 每个连接连续发送 requests 个请求，统计单个请求的延迟分位数和总吞吐
+# 客户端与服务端在同一台机器上争用 CPU，结果偏保守
+
+SAMPLE = {
+    'secid': '1.600519',
+    'name': '贵州茅台',
+    'latest_price': 1467.2,
+    'change_percent': -0.86,
+    'update_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+}
+
+def run_server(host, port, ready):
+    async def main():
+        cache = PriceCache()
+        cache.update([SAMPLE])
+        server = PriceServer(cache)
+        await server.start(host, port)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+async def client(host, port, requests, latencies, conditional):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f'GET {PATH} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode()
+    etag = None
+    for _ in range(requests):
+        start = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = 0
+        for line in head.split(b'\r\n'):
+            name, _, value = line.partition(b':')
+            name = name.lower()
+            if name == b'content-length':
+                length = int(value)
+            elif name == b'etag' and conditional and etag is None:
+                etag = value.strip()
+                request = (f'GET {PATH} HTTP/1.1\r\nHost: {host}\r\n'
+                           f'If-None-Match: {etag.decode()}\r\n\r\n').encode()
+        if length:
+            await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def load(host, port, clients, requests, conditional):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, requests, latencies, conditional) for _ in range(clients)))
+    return latencies, time.perf_counter() - start
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="价格接口压测")
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--clients', type=int, default=1000, help="并发连接数")
+    parser.add_argument('--requests', type=int, default=20, help="每个连接的请求数")
+    parser.add_argument('--conditional', action='store_true', help="首个响应之后带 If-None-Match，走 304")
+    args = parser.parse_args()
+
+    host = '127.0.0.1'
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=run_server, args=(host, args.port, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+    try:
+        latencies, elapsed = asyncio.run(load(host, args.port, args.clients, args.requests, args.conditional))
+    finally:
+        server.terminate()
+    latencies.sort()
+    total = len(latencies)
+    print(f"并发连接: {args.clients}，请求总数: {total}，耗时 {elapsed:.2f}s，吞吐 {total / elapsed:.0f} req/s")
+    print(f"延迟 p50: {percentile(latencies, 50) * 1000:.2f} ms  "
+          f"p99: {percentile(latencies, 99) * 1000:.2f} ms  "
+          f"max: {latencies[-1] * 1000:.2f} ms")
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+from local_broker import Broker
+from mqtt_transport import ReliablePublisher
+
+# 断线重连测试：发布过程中停止本地代理，数秒后在同一端口重新启动
+# 代理端记录收到的序号，最后检查是否每条消息都至少到达一次，并统计重复和乱序
+
+TOPIC = "sc104/maotai/reconnect-test"
+
+class RecordingBroker(Broker):
+    """记录每条业务消息的序号"""
+
+    def __init__(self, received):
+        super().__init__()
+        self.received = received
+
+    def route(self, topic, payload, qos, retain):
+        if topic == TOPIC:
+            self.received.append(json.loads(payload)['seq'])
+        super().route(topic, payload, qos, retain)
+
+class BrokerThread:
+    """在后台事件循环中启动、停止代理"""
+
+    def __init__(self, port, received):
+        self.port = port
+        self.received = received
+        self.loop = asyncio.new_event_loop()
+        self.broker = None
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def start(self):
+        self.broker = RecordingBroker(self.received)
+        self.call(self.broker.start('127.0.0.1', self.port))
+
+    def stop(self):
+        self.call(self.broker.stop())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="发布通道断线重连测试")
+    parser.add_argument('--port', type=int, default=18830)
+    parser.add_argument('--count', type=int, default=2000, help="发布的消息总数")
+    parser.add_argument('--rate', type=float, default=200, help="每秒发布条数")
+    parser.add_argument('--outage', type=float, default=3, help="代理停止的秒数")
+    parser.add_argument('--queue', type=int, default=100000, help="发布队列容量")
+    parser.add_argument('--spool', action='store_true', help="使用磁盘队列")
+    args = parser.parse_args()
+
+    received = []
+    broker = BrokerThread(args.port, received)
+    broker.start()
+    spool = os.path.join(tempfile.mkdtemp(), 'publisher.spool') if args.spool else None
+    publisher = ReliablePublisher('127.0.0.1', args.port, client_id='reconnect-test',
+                                  max_queue=args.queue, spool=spool, max_delay=2)
+    publisher.start()
+
+    start = time.monotonic()
+    for seq in range(args.count):
+        if seq == args.count // 3:
+            print(f"第 {seq} 条：停止代理 {args.outage} 秒")
+            broker.stop()
+            threading.Timer(args.outage, broker.start).start()
+        publisher.publish(TOPIC, json.dumps({'seq': seq, 'latest_price': 1467.2}))
+        time.sleep(max(0.0, start + (seq + 1) / args.rate - time.monotonic()))
+
+    # 等待代理恢复后补发完毕
+    deadline = time.monotonic() + args.outage + 30
+    while publisher.stats()['queued'] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    publisher.stop()
+
+    unique = set(received)
+    missing = sorted(set(range(args.count)) - unique)
+    out_of_order = sum(1 for a, b in zip(received, received[1:]) if b < a)
+    print(f"发布统计: {publisher.stats()}")
+    print(f"代理收到 {len(received)} 条，去重后 {len(unique)}/{args.count}，"
+          f"重复 {len(received) - len(unique)}，乱序 {out_of_order}，丢失 {len(missing)}")
+    if missing:
+        print(f"丢失的序号: {missing[:20]}")
+        raise SystemExit(1)
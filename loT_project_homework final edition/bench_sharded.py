@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from bench_pipeline import LIST_PATH, make_handler, synthetic_frames, watchlist
+from local_broker import Broker
+from sharded import ShardSupervisor
+
+# 分片抓取的扩展性测试：分片数逐级增加，每个分片不等待地连续抓取、解析、发布，统计总吞吐
+# 模拟接口由多个进程共用一个端口（SO_REUSEPORT）提供，避免接口本身成为瓶颈
+# 理想情况下吞吐随分片数线性增长，效率 = 吞吐 / (单分片吞吐 x 分片数)；分片数超过 CPU 核数后不再增长
+
+class ReusePortServer(ThreadingHTTPServer):
+    allow_reuse_port = True
+    daemon_threads = True
+
+def run_stub(port, frames, ready):
+    server = ReusePortServer(('127.0.0.1', port), make_handler(frames))
+    ready.set()
+    server.serve_forever()
+
+def run_broker(port, ready):
+    async def main():
+        await Broker().start('127.0.0.1', port)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+def start_infra(upstream_port, broker_port, stubs):
+    frames = synthetic_frames()
+    events = []
+    for _ in range(stubs):
+        ready = multiprocessing.Event()
+        multiprocessing.Process(target=run_stub, args=(upstream_port, frames, ready), daemon=True).start()
+        events.append(ready)
+    ready = multiprocessing.Event()
+    multiprocessing.Process(target=run_broker, args=(broker_port, ready), daemon=True).start()
+    events.append(ready)
+    for event in events:
+        event.wait(10)
+
+def measure(symbols, shards, options, warmup, duration):
+    """返回 (行情/秒, 消息/秒, 重启次数)"""
+    supervisor = ShardSupervisor(watchlist(symbols), shards, options)
+    supervisor.start()
+    time.sleep(warmup)  # 等待进程启动、建立连接
+    before = supervisor.stats()
+    start = time.monotonic()
+    supervisor.run(duration)
+    elapsed = time.monotonic() - start
+    after = supervisor.stats()
+    supervisor.stop()
+    return ((after['quotes'] - before['quotes']) / elapsed,
+            (after['messages'] - before['messages']) / elapsed,
+            after['restarts'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分片抓取扩展性测试")
+    parser.add_argument('--symbols', type=int, default=2000, help="自选股数量")
+    parser.add_argument('--shards', default=None, help="逐级的分片数，逗号分隔，默认 1,2,4... 直到 CPU 核数")
+    parser.add_argument('--duration', type=float, default=5, help="每一级测量的秒数")
+    parser.add_argument('--warmup', type=float, default=2, help="每一级开始测量前等待的秒数")
+    parser.add_argument('--stubs', type=int, default=os.cpu_count(), help="模拟接口的进程数")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4, help="每个分片同时进行的批量请求数")
+    parser.add_argument('--upstream-port', type=int, default=18580)
+    parser.add_argument('--broker-port', type=int, default=18983)
+    args = parser.parse_args()
+
+    if args.shards:
+        levels = [int(n) for n in args.shards.split(',')]
+    else:
+        levels = [1]
+        while levels[-1] * 2 <= os.cpu_count():
+            levels.append(levels[-1] * 2)
+    start_infra(args.upstream_port, args.broker_port, args.stubs)
+    options = {
+        'interval': 0,  # 不等待，测量最大吞吐
+        'batch_size': args.batch_size,
+        'max_workers': args.workers,
+        'binary': False,
+        'broker': '127.0.0.1',
+        'port': args.broker_port,
+        'list_api_url': f"http://127.0.0.1:{args.upstream_port}{LIST_PATH}",
+    }
+    print(f"CPU 核数 {os.cpu_count()}，自选股 {args.symbols} 只，模拟接口进程 {args.stubs} 个")
+    baseline = None
+    for shards in levels:
+        quotes, messages, restarts = measure(args.symbols, shards, options, args.warmup, args.duration)
+        baseline = baseline or quotes
+        efficiency = quotes / (baseline * shards) * 100
+        print(f"{shards} 个分片: {quotes:.0f} 条行情/秒，{messages:.0f} 条消息/秒，"
+              f"加速比 {quotes / baseline:.2f}，效率 {efficiency:.0f}%，重启 {restarts} 次")
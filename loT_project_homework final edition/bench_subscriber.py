@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from local_broker import Broker, PUBLISH, encode_length, encode_string
+from sinks import CallbackSink
+from subscribe import QueuedSubscriber
+
+# 订阅者压测：启动本地代理，用原始 socket 高速灌入消息，统计订阅者的处理速率和背压
+
+def start_broker(port):
+    """在后台线程中运行本地代理"""
+    ready = threading.Event()
+
+    def run():
+        async def main():
+            await Broker().start('127.0.0.1', port)
+            ready.set()
+            await asyncio.Event().wait()
+        asyncio.run(main())
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+
+def flood(port, topic, count):
+    """预先编码好 PUBLISH 报文，以最快速度发送 count 条 QoS 0 消息"""
+    sock = socket.create_connection(('127.0.0.1', port))
+    body = b'\x00\x04MQTT\x04\x02\x00\x3c' + encode_string('bench-publisher')
+    sock.sendall(bytes([0x10]) + encode_length(len(body)) + body)
+    sock.recv(4)
+    packets = []
+    for i in range(count):
+        payload = json.dumps({'current_price': 1467.2 + i / 100, 'future_price': 1480.5, 'seq': i}).encode()
+        body = encode_string(topic) + payload
+        packets.append(bytes([PUBLISH << 4]) + encode_length(len(body)) + body)
+    start = time.perf_counter()
+    for i in range(0, count, 1000):
+        sock.sendall(b''.join(packets[i:i + 1000]))
+    sock.sendall(b'\xe0\x00')
+    sock.close()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="订阅者压测")
+    parser.add_argument('--port', type=int, default=18883)
+    parser.add_argument('--count', type=int, default=100000, help="发送的消息数")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    start_broker(args.port)
+    counted = [0]
+    subscriber = QueuedSubscriber([CallbackSink(lambda records: counted.__setitem__(0, counted[0] + len(records)))],
+                                  maxsize=args.queue_size, workers=args.workers, batch_size=args.batch_size)
+    connected = threading.Event()
+    client = mqtt.Client(client_id="bench-subscriber")
+    client.on_message = subscriber.on_message
+    client.on_subscribe = lambda *a: connected.set()
+    client.on_connect = lambda c, u, f, rc: c.subscribe("bench/quotes")
+    client.connect('127.0.0.1', args.port)
+    client.loop_start()
+    connected.wait(5)
+
+    start = time.perf_counter()
+    send_time = flood(args.port, "bench/quotes", args.count)
+    while subscriber.stats()['processed'] < args.count and time.perf_counter() - start < 60:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    client.loop_stop()
+    subscriber.stop()
+
+    stats = subscriber.stats()
+    print(f"发送 {args.count} 条耗时 {send_time:.2f}s，处理完成耗时 {elapsed:.2f}s")
+    print(f"吞吐: {stats['processed'] / elapsed:.0f} msgs/s")
+    print(f"统计: {stats}")
@@ -0,0 +1,63 @@
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from tsdb import TimeSeriesStore
+
+# 写入一只股票一整天的逐笔数据，测量追加速度、范围查询和 K 线查询的耗时
+# 默认每秒 3 笔、共 24 小时，约 26 万条，远多于实际交易时段的数据量
+
+SYMBOL = '1.600519'
+DAY_START = 1700006400  # 某日 00:00 UTC
+
+def fill(store, ticks_per_second):
+    step = 1 / ticks_per_second
+    price = 1467.2
+    count = 86400 * ticks_per_second
+    start = time.perf_counter()
+    for i in range(count):
+        price = round(price + random.uniform(-0.5, 0.5), 2)
+        store.append(SYMBOL, DAY_START + i * step, price)
+    return count, time.perf_counter() - start
+
+def timed(func, repeat):
+    """返回 (结果, 单次平均耗时毫秒)"""
+    result = func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="时间序列存储基准测试")
+    parser.add_argument('--rate', type=int, default=3, help="每秒逐笔条数")
+    parser.add_argument('--repeat', type=int, default=20, help="查询重复次数")
+    args = parser.parse_args()
+
+    random.seed(0)
+    root = tempfile.mkdtemp(prefix='tsdb-bench-')
+    try:
+        store = TimeSeriesStore(root)
+        count, seconds = fill(store, args.rate)
+        print(f"追加 {count} 条: {seconds:.2f} 秒 ({count / seconds:.0f} 条/秒)")
+        store.close()
+
+        # 重新打开，查询走内存映射的文件
+        store = TimeSeriesStore(root)
+        queries = [
+            ('一整天逐笔', lambda: store.range(SYMBOL, DAY_START, DAY_START + 86400)),
+            ('1 小时逐笔', lambda: store.range(SYMBOL, DAY_START + 36000, DAY_START + 39600)),
+            ('1 分钟 K 线', lambda: store.ohlc(SYMBOL, 60, DAY_START, DAY_START + 86400)),
+            ('5 分钟 K 线', lambda: store.ohlc(SYMBOL, 300, DAY_START, DAY_START + 86400)),
+            ('1 小时 K 线', lambda: store.ohlc(SYMBOL, 3600, DAY_START, DAY_START + 86400)),
+        ]
+        print(f"{'查询':<12}{'行数':>10}{'耗时(ms)':>12}")
+        for name, query in queries:
+            result, ms = timed(query, args.repeat)
+            rows = len(result[0]) if isinstance(result, tuple) else len(result)
+            print(f"{name:<12}{rows:>10}{ms:>12.2f}")
+        store.close()
+    finally:
+        shutil.rmtree(root)
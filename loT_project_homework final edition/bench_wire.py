@@ -0,0 +1,41 @@
+import argparse
+import json
+import time
+from datetime import datetime
+
+from wire_format import decode_quote, encode_quote
+
+# 对比 JSON 与二进制格式每条消息的字节数和解码耗时
+
+SAMPLE = {
+    'secid': '1.600519',
+    'code': '600519',
+    'name': '贵州茅台',
+    'latest_price': 1467.2,
+    'change_amount': -12.8,
+    'change_percent': -0.86,
+    'update_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+}
+
+def time_decode(func, payload, repeat):
+    """重复解码，返回单次平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="消息格式基准测试")
+    parser.add_argument('--repeat', type=int, default=100000, help="解码重复次数")
+    args = parser.parse_args()
+
+    json_payload = json.dumps(SAMPLE, ensure_ascii=False).encode('utf-8')
+    binary_payload = encode_quote(SAMPLE, time.time())
+
+    results = [
+        ('json', len(json_payload), time_decode(lambda p: json.loads(p.decode()), json_payload, args.repeat)),
+        ('binary', len(binary_payload), time_decode(decode_quote, binary_payload, args.repeat)),
+    ]
+    print(f"{'format':<10}{'bytes':>8}{'decode(us)':>12}")
+    for name, size, us in results:
+        print(f"{name:<10}{size:>8}{us:>12.2f}")
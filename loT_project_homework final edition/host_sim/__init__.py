@@ -0,0 +1,22 @@
+# 在 CPython 上模拟 MicroPython 的硬件相关模块，方便在电脑上运行和测试 OLED 驱动
+# 使用方法: import host_sim; host_sim.install(); import ssd1306
+
+import builtins
+import os
+import sys
+import time
+
+
+def install():
+    """让 import machine / framebuf 解析到本目录下的模拟模块"""
+    # MicroPython 的 const() 由编译器识别，CPython 中没有，按原值返回即可
+    builtins.const = lambda value: value
+    # MicroPython 的 time 模块多出的毫秒/微秒接口
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1000000)
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+    time.ticks_us = lambda: int(time.monotonic() * 1000000)
+    time.ticks_diff = lambda new, old: new - old
+    path = os.path.dirname(os.path.abspath(__file__))
+    if path not in sys.path:
+        sys.path.insert(0, path)
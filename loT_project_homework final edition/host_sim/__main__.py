@@ -0,0 +1,18 @@
+# 在模拟环境中运行设备脚本，例如: python -m host_sim main.py
+
+import os
+import runpy
+import sys
+
+from host_sim import install
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python -m host_sim <脚本> [参数...]")
+        sys.exit(1)
+    install()
+    script = sys.argv[1]
+    sys.argv = sys.argv[1:]
+    # 与设备上一样，脚本所在目录中的模块（如 ssd1306）可以直接导入
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    runpy.run_path(script, run_name="__main__")
@@ -0,0 +1,81 @@
+# MicroPython framebuf 模块的纯 Python 实现，只支持 SSD1306 使用的 MONO_VLSB 格式
+# 每个字节表示一列中纵向的 8 个像素，低位在上，与设备上的内存布局一致
+
+MONO_VLSB = 0
+
+
+def _glyph(ch):
+    """8x8 字形。设备固件的字库不在这里，用按字符生成的固定图案代替，
+    像素内容与设备不同，但每个字符占用的区域一致"""
+    code = ord(ch) if 32 < ord(ch) < 127 else 0
+    if code == 0:
+        return bytes(8)
+    return bytes(((code * (col + 7)) ^ (code >> 1)) & 0x7e for col in range(8))
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format=MONO_VLSB, stride=None):
+        if format != MONO_VLSB:
+            raise ValueError("only MONO_VLSB is simulated")
+        self.buf = buffer
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+
+    def fill(self, col):
+        value = 0xff if col else 0x00
+        for i in range((self.height + 7) // 8 * self.stride):
+            self.buf[i] = value
+
+    def pixel(self, x, y, col=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        index = (y >> 3) * self.stride + x
+        bit = 1 << (y & 7)
+        if col is None:
+            return 1 if self.buf[index] & bit else 0
+        if col:
+            self.buf[index] |= bit
+        else:
+            self.buf[index] &= ~bit & 0xff
+
+    def fill_rect(self, x, y, w, h, col):
+        for yy in range(max(y, 0), min(y + h, self.height)):
+            for xx in range(max(x, 0), min(x + w, self.width)):
+                self.pixel(xx, yy, col)
+
+    def hline(self, x, y, w, col):
+        self.fill_rect(x, y, w, 1, col)
+
+    def vline(self, x, y, h, col):
+        self.fill_rect(x, y, 1, h, col)
+
+    def rect(self, x, y, w, h, col):
+        self.hline(x, y, w, col)
+        self.hline(x, y + h - 1, w, col)
+        self.vline(x, y, h, col)
+        self.vline(x + w - 1, y, h, col)
+
+    def text(self, string, x, y, col=1):
+        for ch in string:
+            glyph = _glyph(ch)
+            for dx in range(8):
+                line = glyph[dx]
+                for dy in range(8):
+                    if line & (1 << dy):
+                        self.pixel(x + dx, y + dy, col)
+            x += 8
+
+    def scroll(self, dx, dy):
+        # 与固件一致：移出的像素丢弃，空出的区域保持原值
+        pixels = [[self.pixel(x, y) for x in range(self.width)] for y in range(self.height)]
+        for y in range(self.height):
+            for x in range(self.width):
+                sx, sy = x - dx, y - dy
+                if 0 <= sx < self.width and 0 <= sy < self.height:
+                    self.pixel(x, y, pixels[sy][sx])
+
+
+def FrameBuffer1(buffer, width, height, stride=None):
+    """旧版接口，等价于 MONO_VLSB 格式的 FrameBuffer"""
+    return FrameBuffer(buffer, width, height, MONO_VLSB, stride)
@@ -0,0 +1,115 @@
+# MicroPython machine 模块的模拟：记录每次总线传输的字节数，并按总线速率估算耗时
+# 可以挂接 panel.SSD1306Panel，让传输内容真正写入模拟屏幕
+
+
+class Bus:
+    """记录总线传输的公共部分"""
+
+    def __init__(self):
+        self.transactions = []  # 每次传输的字节数
+        self.device = None  # 挂接在总线上的模拟设备
+
+    def record(self, nbytes):
+        self.transactions.append(nbytes)
+
+    def reset(self):
+        self.transactions = []
+
+    def stats(self):
+        return {'transactions': len(self.transactions), 'bytes': sum(self.transactions)}
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+
+    def __init__(self, id, mode=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self._value = value or 0
+
+    def init(self, mode=-1, value=None):
+        self.mode = mode
+        if value is not None:
+            self._value = value
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = 1 if value else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    high = on
+    low = off
+
+
+class I2C(Bus):
+    def __init__(self, id=0, scl=None, sda=None, freq=400000, devices=(0x3c,)):
+        super().__init__()
+        self.freq = freq
+        self.devices = list(devices)
+
+    def attach(self, device):
+        """挂接模拟设备，之后的写入都会交给 device.i2c_write 处理"""
+        self.device = device
+
+    def scan(self):
+        return list(self.devices)
+
+    def writeto(self, addr, buf, stop=True):
+        self.record(len(buf))
+        if self.device is not None:
+            self.device.i2c_write(buf)
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        # 多个缓冲区在同一次传输中连续发出
+        self.writeto(addr, b''.join(bytes(buf) for buf in vector), stop)
+
+    def bus_time(self, freq=None):
+        """估算传输耗时（秒）：每字节 9 位（含 ACK），每次传输另加地址字节及起止位"""
+        freq = freq or self.freq
+        bits = sum((nbytes + 1) * 9 + 2 for nbytes in self.transactions)
+        return bits / freq
+
+
+class SPI(Bus):
+    def __init__(self, id=1, baudrate=1000000, polarity=0, phase=0, sck=None, mosi=None, miso=None):
+        super().__init__()
+        self.baudrate = baudrate
+        self.inits = 0  # init() 被调用的次数
+        self.dc = None
+
+    def attach(self, device, dc):
+        """挂接模拟设备，dc 为 D/C# 引脚，用来区分命令和数据"""
+        self.device = device
+        self.dc = dc
+
+    def init(self, baudrate=None, polarity=0, phase=0, **kwargs):
+        self.inits += 1
+        if baudrate:
+            self.baudrate = baudrate
+
+    def write(self, buf):
+        self.record(len(buf))
+        if self.device is not None:
+            self.device.spi_write(buf, self.dc.value())
+
+    def reset(self):
+        super().reset()
+        self.inits = 0
+
+    def stats(self):
+        stats = super().stats()
+        stats['inits'] = self.inits
+        return stats
+
+    def bus_time(self, baudrate=None):
+        """估算传输耗时（秒）：每字节 8 个时钟"""
+        baudrate = baudrate or self.baudrate
+        return sum(self.transactions) * 8 / baudrate
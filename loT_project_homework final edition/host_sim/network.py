@@ -0,0 +1,37 @@
+# MicroPython network 模块的模拟：WLAN 连接立即成功，实际网络访问走电脑本机的网络
+
+STA_IF = 0
+AP_IF = 1
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self._connected = False
+        self.ssid = None
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = bool(value)
+
+    def connect(self, ssid=None, key=None):
+        if not self._active:
+            raise OSError("Wifi Not Started")
+        self.ssid = ssid
+        self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._connected
+
+    def status(self, param=None):
+        if param == 'rssi':
+            return -50
+        return 1010 if self._connected else 1000  # STAT_GOT_IP / STAT_IDLE
+
+    def ifconfig(self, config=None):
+        return ('192.168.4.2', '255.255.255.0', '192.168.4.1', '8.8.8.8')
@@ -0,0 +1,7 @@
+# MicroPython ntptime 模块的模拟：电脑的系统时钟已经同步，校时什么也不做
+
+host = "pool.ntp.org"
+
+
+def settime():
+    pass
@@ -0,0 +1,102 @@
+# SSD1306 显示屏控制器的模拟：解析驱动发出的命令和数据，维护屏幕显存
+# 挂到模拟总线上后，可以检查屏幕上实际显示的内容是否与驱动的帧缓冲一致
+
+# 带参数的命令及其参数个数
+_ARGS = {
+    0x20: 1,  # SET_MEM_ADDR
+    0x21: 2,  # SET_COL_ADDR
+    0x22: 2,  # SET_PAGE_ADDR
+    0x81: 1,  # SET_CONTRAST
+    0x8d: 1,  # SET_CHARGE_PUMP
+    0xa8: 1,  # SET_MUX_RATIO
+    0xd3: 1,  # SET_DISP_OFFSET
+    0xd5: 1,  # SET_DISP_CLK_DIV
+    0xd9: 1,  # SET_PRECHARGE
+    0xda: 1,  # SET_COM_PIN_CFG
+    0xdb: 1,  # SET_VCOM_DESEL
+}
+
+COLUMNS = 128  # 控制器内部显存固定 128 列
+
+
+class SSD1306Panel:
+    def __init__(self, pages=8):
+        self.pages = pages
+        self.ram = bytearray(COLUMNS * pages)
+        self.col_start, self.col_end = 0, COLUMNS - 1
+        self.page_start, self.page_end = 0, pages - 1
+        self.col, self.page = 0, 0
+        self.display_on = False
+        self.contrast = 0x7f
+        self.inverted = False
+        self.pending = []  # 尚未收齐参数的命令
+
+    def command(self, byte):
+        """处理一个命令字节"""
+        pending = self.pending
+        pending.append(byte)
+        if len(pending) <= _ARGS.get(pending[0], 0):
+            return
+        cmd, args = pending[0], pending[1:]
+        self.pending = []
+        if cmd == 0x21:
+            self.col_start, self.col_end = args
+            self.col = self.col_start
+        elif cmd == 0x22:
+            self.page_start, self.page_end = args
+            self.page = self.page_start
+        elif cmd == 0x81:
+            self.contrast = args[0]
+        elif cmd in (0xae, 0xaf):
+            self.display_on = cmd == 0xaf
+        elif cmd in (0xa6, 0xa7):
+            self.inverted = cmd == 0xa7
+
+    def data(self, buf):
+        """按水平寻址模式写入显存"""
+        for byte in buf:
+            self.ram[self.page * COLUMNS + self.col] = byte
+            self.col += 1
+            if self.col > self.col_end:
+                self.col = self.col_start
+                self.page += 1
+                if self.page > self.page_end:
+                    self.page = self.page_start
+
+    def i2c_write(self, buf):
+        """I2C 传输：首字节为控制字节，Co=1 时命令与控制字节交替出现"""
+        buf = bytes(buf)
+        i = 0
+        while i < len(buf):
+            control = buf[i]
+            if control & 0x80:
+                # Co=1：只跟一个字节，之后又是控制字节
+                if i + 1 < len(buf):
+                    if control & 0x40:
+                        self.data(buf[i + 1:i + 2])
+                    else:
+                        self.command(buf[i + 1])
+                i += 2
+            else:
+                if control & 0x40:
+                    self.data(buf[i + 1:])
+                else:
+                    for byte in buf[i + 1:]:
+                        self.command(byte)
+                break
+
+    def spi_write(self, buf, dc):
+        """SPI 传输：由 D/C# 引脚决定是命令还是数据"""
+        if dc:
+            self.data(bytes(buf))
+        else:
+            for byte in bytes(buf):
+                self.command(byte)
+
+    def visible(self, width=128, offset=0):
+        """返回屏幕可见区域的显存，布局与驱动的帧缓冲相同"""
+        out = bytearray()
+        for page in range(self.pages):
+            start = page * COLUMNS + offset
+            out += self.ram[start:start + width]
+        return bytes(out)
@@ -0,0 +1,201 @@
+# MicroPython umqtt.simple 的模拟，接口与设备上的库一致，通过本机 socket 连接真实的代理
+
+import socket
+import struct
+
+
+class MQTTException(Exception):
+    pass
+
+
+class MQTTClient:
+    def __init__(self, client_id, server, port=0, user=None, password=None, keepalive=0,
+                 ssl=False, ssl_params={}):
+        if port == 0:
+            port = 8883 if ssl else 1883
+        self.client_id = client_id
+        self.sock = None
+        self.server = server
+        self.port = port
+        self.user = user
+        self.pswd = password
+        self.keepalive = keepalive
+        self.cb = None
+        self.pid = 0
+        self.lw_topic = None
+        self.lw_msg = None
+        self.lw_qos = 0
+        self.lw_retain = False
+
+    def _send_str(self, s):
+        if isinstance(s, str):
+            s = s.encode('utf-8')
+        self.sock.sendall(struct.pack('!H', len(s)) + s)
+
+    def _recv_len(self):
+        n = 0
+        sh = 0
+        while True:
+            b = self.sock.recv(1)[0]
+            n |= (b & 0x7f) << sh
+            if not b & 0x80:
+                return n
+            sh += 7
+
+    def _recv_exact(self, n):
+        data = b''
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise OSError(-1)
+            data += chunk
+        return data
+
+    def _encode_len(self, premsg, sz):
+        i = 1
+        while sz > 0x7f:
+            premsg[i] = (sz & 0x7f) | 0x80
+            sz >>= 7
+            i += 1
+        premsg[i] = sz
+        return i
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def set_last_will(self, topic, msg, retain=False, qos=0):
+        assert 0 <= qos <= 2
+        assert topic
+        self.lw_topic = topic
+        self.lw_msg = msg
+        self.lw_qos = qos
+        self.lw_retain = retain
+
+    def connect(self, clean_session=True):
+        self.sock = socket.create_connection((self.server, self.port))
+        premsg = bytearray(b"\x10\0\0\0\0\0")
+        msg = bytearray(b"\x04MQTT\x04\x02\0\0")
+
+        sz = 10 + 2 + len(self.client_id)
+        msg[6] = clean_session << 1
+        if self.user is not None:
+            sz += 2 + len(self.user) + 2 + len(self.pswd)
+            msg[6] |= 0xC0
+        if self.keepalive:
+            msg[7] |= self.keepalive >> 8
+            msg[8] |= self.keepalive & 0x00FF
+        if self.lw_topic:
+            sz += 2 + len(self.lw_topic) + 2 + len(self.lw_msg)
+            msg[6] |= 0x4 | (self.lw_qos & 0x1) << 3 | (self.lw_qos & 0x2) << 3
+            msg[6] |= self.lw_retain << 5
+
+        i = self._encode_len(premsg, sz)
+        # premsg 多发的一个 0 字节是协议名长度的高位，msg 从低位 0x04 开始
+        self.sock.sendall(bytes(premsg[:i + 2]) + bytes(msg))
+        self._send_str(self.client_id)
+        if self.lw_topic:
+            self._send_str(self.lw_topic)
+            self._send_str(self.lw_msg)
+        if self.user is not None:
+            self._send_str(self.user)
+            self._send_str(self.pswd)
+        resp = self._recv_exact(4)
+        assert resp[0] == 0x20 and resp[1] == 0x02
+        if resp[3] != 0:
+            raise MQTTException(resp[3])
+        return resp[2] & 1
+
+    def disconnect(self):
+        self.sock.sendall(b"\xe0\0")
+        self.sock.close()
+
+    def ping(self):
+        self.sock.sendall(b"\xc0\0")
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        if isinstance(topic, str):
+            topic = topic.encode('utf-8')
+        if isinstance(msg, str):
+            msg = msg.encode('utf-8')
+        pkt = bytearray(b"\x30\0\0\0")
+        pkt[0] |= qos << 1 | retain
+        sz = 2 + len(topic) + len(msg)
+        if qos > 0:
+            sz += 2
+        assert sz < 2097152
+        i = self._encode_len(pkt, sz)
+        self.sock.sendall(bytes(pkt[:i + 1]))
+        self._send_str(topic)
+        if qos > 0:
+            self.pid += 1
+            pid = self.pid
+            self.sock.sendall(struct.pack('!H', pid))
+        self.sock.sendall(msg)
+        if qos == 1:
+            while True:
+                op = self.wait_msg()
+                if op == 0x40:
+                    sz = self.sock.recv(1)
+                    assert sz == b"\x02"
+                    rcv_pid = struct.unpack('!H', self._recv_exact(2))[0]
+                    if pid == rcv_pid:
+                        return
+
+    def subscribe(self, topic, qos=0):
+        assert self.cb is not None, "Subscribe callback is not set"
+        if isinstance(topic, str):
+            topic = topic.encode('utf-8')
+        pkt = bytearray(b"\x82\0\0\0")
+        self.pid += 1
+        sz = 2 + 2 + len(topic) + 1
+        i = self._encode_len(pkt, sz)
+        self.sock.sendall(bytes(pkt[:i + 1]) + struct.pack('!H', self.pid))
+        self._send_str(topic)
+        self.sock.sendall(bytes([qos]))
+        while True:
+            op = self.wait_msg()
+            if op == 0x90:
+                resp = self._recv_exact(4)
+                assert resp[1] == (self.pid >> 8) & 0xff and resp[2] == self.pid & 0xff
+                if resp[3] == 0x80:
+                    raise MQTTException(resp[3])
+                return
+
+    def wait_msg(self):
+        """读取一个报文：PUBLISH 交给回调，其余类型返回报文类型由调用者处理"""
+        res = self.sock.recv(1)
+        self.sock.setblocking(True)
+        if res is None:
+            return None
+        if res == b"":
+            raise OSError(-1)
+        if res == b"\xd0":  # PINGRESP
+            sz = self.sock.recv(1)[0]
+            assert sz == 0
+            return None
+        op = res[0]
+        if op & 0xf0 != 0x30:
+            return op
+        sz = self._recv_len()
+        topic_len = struct.unpack('!H', self._recv_exact(2))[0]
+        topic = self._recv_exact(topic_len)
+        sz -= topic_len + 2
+        if op & 6:
+            pid = struct.unpack('!H', self._recv_exact(2))[0]
+            sz -= 2
+        msg = self._recv_exact(sz)
+        self.cb(topic, msg)
+        if op & 6 == 2:
+            self.sock.sendall(b"\x40\x02" + struct.pack('!H', pid))
+        elif op & 6 == 4:
+            assert 0
+        return op
+
+    def check_msg(self):
+        """非阻塞检查是否有消息"""
+        self.sock.setblocking(False)
+        try:
+            return self.wait_msg()
+        except BlockingIOError:
+            self.sock.setblocking(True)
+            return None
@@ -0,0 +1,45 @@
+# MicroPython urequests 模块的模拟，基于 urllib 实现
+
+import json
+import urllib.error
+import urllib.request
+
+
+class Response:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def request(method, url, data=None, json_data=None, headers=None, timeout=10):
+    headers = dict(headers or {})
+    if json_data is not None:
+        data = json.dumps(json_data).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return Response(resp.status, resp.read(), dict(resp.headers))
+    except urllib.error.HTTPError as e:
+        return Response(e.code, e.read(), dict(e.headers))
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, data=None, json=None, **kwargs):
+    return request('POST', url, data=data, json_data=json, **kwargs)
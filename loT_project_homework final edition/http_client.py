@@ -0,0 +1,176 @@
+# 设备端的小型 HTTP 客户端：保持长连接，并用 ETag / Last-Modified 发送条件请求
+# 只依赖 socket 和 ssl，MicroPython 与 CPython 都可以使用
+
+import socket
+
+from json_stream import FieldExtractor
+
+try:
+    import ssl
+except ImportError:
+    import ussl as ssl
+
+
+class HTTPClient:
+    def __init__(self, url, timeout=10):
+        scheme, _, rest = url.partition('://')
+        host, _, path = rest.partition('/')
+        self.tls = scheme == 'https'
+        port = 443 if self.tls else 80
+        if ':' in host:
+            host, port = host.split(':')
+            port = int(port)
+        self.host = host
+        self.port = port
+        self.path = '/' + path
+        self.timeout = timeout
+        self.sock = None
+        self.stream = None
+        self.etag = None
+        self.last_modified = None
+        self.connects = 0  # 建立连接（含 TLS 握手）的次数
+
+    def connect(self):
+        addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        sock = socket.socket()
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(addr)
+            if self.tls:
+                if hasattr(ssl, 'create_default_context'):
+                    sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+                else:
+                    sock = ssl.wrap_socket(sock, server_hostname=self.host)
+        except Exception:
+            sock.close()
+            raise
+        self.sock = sock
+        # CPython 的 socket 需要 makefile 才有 readline；MicroPython 的 SSL 对象没有 makefile，
+        # 但本身就有 read / readline / write，直接作为流使用
+        self.stream = sock.makefile('rwb', 0) if hasattr(sock, 'makefile') else sock
+        self.connects += 1
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+        self.stream = None
+
+    def write_all(self, data):
+        while data:
+            n = self.stream.write(data)
+            # 阻塞模式下 MicroPython 的部分流对象写完后返回 None
+            data = data[n:] if n is not None else b''
+
+    def read_exact(self, n):
+        data = b''
+        while len(data) < n:
+            chunk = self.stream.read(n - len(data))
+            if not chunk:
+                raise OSError('connection closed')
+            data += chunk
+        return data
+
+    def send_request(self):
+        """发送 GET 请求并读取状态行和响应头，返回 (状态码, 响应头)"""
+        lines = [
+            'GET %s HTTP/1.1' % self.path,
+            'Host: %s' % self.host,
+            'Connection: keep-alive',
+        ]
+        if self.etag:
+            lines.append('If-None-Match: %s' % self.etag)
+        if self.last_modified:
+            lines.append('If-Modified-Since: %s' % self.last_modified)
+        self.write_all(('\r\n'.join(lines) + '\r\n\r\n').encode())
+
+        status_line = self.stream.readline()
+        if not status_line:
+            raise OSError('connection closed')
+        status = int(status_line.split(None, 2)[1])
+        headers = {}
+        while True:
+            line = self.stream.readline()
+            if not line or line == b'\r\n':
+                break
+            key, _, value = line.decode().partition(':')
+            headers[key.strip().lower()] = value.strip()
+        return status, headers
+
+    def iter_body(self, headers, chunk_size=64):
+        """按 Content-Length 或分块编码逐块读取响应体，每块不超过 chunk_size 字节"""
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.stream.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.stream.readline()
+                    return
+                while size:
+                    n = min(size, chunk_size)
+                    yield self.read_exact(n)
+                    size -= n
+                self.stream.readline()
+        length = int(headers.get('content-length', 0))
+        while length:
+            n = min(length, chunk_size)
+            yield self.read_exact(n)
+            length -= n
+
+    def read_body(self, headers):
+        """读取完整响应体"""
+        return b''.join(self.iter_body(headers, 512))
+
+    def request(self):
+        """发送请求，复用的连接已被服务器关闭时重连重试一次"""
+        for attempt in (0, 1):
+            reused = self.sock is not None
+            if not reused:
+                self.connect()
+            try:
+                return self.send_request()
+            except OSError:
+                self.close()
+                if not reused or attempt:
+                    raise
+
+    def finish(self, status, headers):
+        """记录缓存校验信息，服务器要求关闭时断开连接"""
+        if status == 200:
+            self.etag = headers.get('etag', self.etag)
+            self.last_modified = headers.get('last-modified', self.last_modified)
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+
+    def get(self):
+        """获取最新内容，内容未变化（304）时返回 None"""
+        status, headers = self.request()
+        try:
+            body = self.read_body(headers)
+        except Exception:
+            self.close()
+            raise
+        self.finish(status, headers)
+        if status == 304:
+            return None
+        if status != 200:
+            raise OSError('HTTP %d' % status)
+        return body
+
+    def get_fields(self, keys, chunk_size=64):
+        """边读边解析，只取出顶层 JSON 对象中的指定键，内容未变化（304）时返回 None"""
+        status, headers = self.request()
+        extractor = FieldExtractor(keys)
+        try:
+            for chunk in self.iter_body(headers, chunk_size):
+                # 取齐字段后继续读完剩余内容，保证连接可以复用
+                if not extractor.done:
+                    extractor.feed(chunk)
+        except Exception:
+            self.close()
+            raise
+        self.finish(status, headers)
+        if status == 304:
+            return None
+        if status != 200:
+            raise OSError('HTTP %d' % status)
+        return extractor.result
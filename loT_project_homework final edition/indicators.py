@@ -0,0 +1,121 @@
+import numpy as np
+
+# 指标计算：每只股票在二维 NumPy 数组中占一行，行内是长度为 window 的环形缓冲区
+# 每个 tick 只用进入和移出窗口的两个值更新累加和，SMA/EMA/滚动标准差/VWAP 都是 O(1)
+# 同一轮抓取的一批行情按行号一起做向量化更新
+
+INDICATOR_SUFFIX = '/indicators'
+
+class IndicatorEngine:
+    def __init__(self, window=20, ema_span=None, capacity=16):
+        self.window = window
+        self.alpha = 2 / ((ema_span or window) + 1)  # EMA 平滑系数
+        self.rows = {}  # 股票 -> 行号
+        self.size = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        """分配或扩大各数组，已有数据保留"""
+        def grow(name, shape, fill, dtype=np.float64):
+            new = np.full(shape, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                new[:len(old)] = old
+            setattr(self, name, new)
+
+        ring = (capacity, self.window)
+        grow('price', ring, 0.0)  # 窗口内的价格
+        grow('pv', ring, 0.0)  # 价格 × 区间成交量
+        grow('dv', ring, 0.0)  # 区间成交量
+        for name in ('sum', 'sumsq', 'sum_pv', 'sum_dv'):
+            grow(name, capacity, 0.0)
+        grow('ema', capacity, np.nan)
+        grow('last_volume', capacity, np.nan)  # 上一个 tick 的当日累计成交量
+        grow('pos', capacity, 0, np.int64)  # 下一个写入位置
+        grow('count', capacity, 0, np.int64)  # 窗口内的样本数
+        self.capacity = capacity
+
+    def row_for(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            if self.size == self.capacity:
+                self.allocate(self.capacity * 2)
+            row = self.rows[key] = self.size
+            self.size += 1
+        return row
+
+    def update(self, keys, prices, volumes=None):
+        """用一批行情更新指标，keys 中每只股票最多出现一次；volumes 为当日累计成交量"""
+        rows = np.fromiter((self.row_for(key) for key in keys), dtype=np.int64, count=len(keys))
+        price = np.asarray(prices, dtype=np.float64)
+        volume = np.full(len(rows), np.nan) if volumes is None else np.asarray(volumes, dtype=np.float64)
+
+        # 区间成交量由累计成交量求差；首个 tick 记为 0，跨日累计量归零时取当前值
+        dv = volume - self.last_volume[rows]
+        dv = np.where(np.isnan(dv), 0.0, np.where(dv < 0, volume, dv))
+        self.last_volume[rows] = np.where(np.isnan(volume), self.last_volume[rows], volume)
+
+        # 用新值替换环形缓冲区中最旧的值，窗口未满时最旧的值为 0
+        pos = self.pos[rows]
+        old_price = self.price[rows, pos]
+        old_pv = self.pv[rows, pos]
+        old_dv = self.dv[rows, pos]
+        pv = price * dv
+        self.price[rows, pos] = price
+        self.pv[rows, pos] = pv
+        self.dv[rows, pos] = dv
+        self.sum[rows] += price - old_price
+        self.sumsq[rows] += price * price - old_price * old_price
+        self.sum_pv[rows] += pv - old_pv
+        self.sum_dv[rows] += dv - old_dv
+
+        ema = self.ema[rows]
+        self.ema[rows] = np.where(np.isnan(ema), price, ema + self.alpha * (price - ema))
+
+        pos = (pos + 1) % self.window
+        self.pos[rows] = pos
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.window)
+
+        # 累加和存在浮点误差，每转一圈按缓冲区重新求和一次，均摊后仍为 O(1)
+        wrapped = rows[pos == 0]
+        if len(wrapped):
+            self.sum[wrapped] = self.price[wrapped].sum(axis=1)
+            self.sumsq[wrapped] = np.square(self.price[wrapped]).sum(axis=1)
+            self.sum_pv[wrapped] = self.pv[wrapped].sum(axis=1)
+            self.sum_dv[wrapped] = self.dv[wrapped].sum(axis=1)
+        return rows
+
+    def values(self, rows):
+        """返回各行当前的指标数组 (sma, ema, std, vwap, count)"""
+        n = self.count[rows].astype(np.float64)
+        total = self.sum[rows]
+        sma = total / n
+        # 样本标准差，与 pandas 的 rolling().std() 一致
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self.sumsq[rows] - total * sma) / (n - 1)
+            std = np.where(n > 1, np.sqrt(np.maximum(var, 0.0)), 0.0)
+            sum_dv = self.sum_dv[rows]
+            vwap = np.where(sum_dv > 0, self.sum_pv[rows] / sum_dv, np.nan)
+        return sma, self.ema[rows], std, vwap, self.count[rows]
+
+    def snapshot(self, key):
+        """单只股票的指标字典"""
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return self.to_dicts(np.array([row]))[0]
+
+    def to_dicts(self, rows):
+        """把指标转换为可直接 JSON 序列化的字典列表，无法计算的值为 None"""
+        sma, ema, std, vwap, count = self.values(rows)
+        result = []
+        for i in range(len(rows)):
+            result.append({
+                'sma': round(float(sma[i]), 4),
+                'ema': round(float(ema[i]), 4),
+                'std': round(float(std[i]), 4),
+                'vwap': None if np.isnan(vwap[i]) else round(float(vwap[i]), 4),
+                'window': self.window,
+                'samples': int(count[i]),
+            })
+        return result
@@ -0,0 +1,145 @@
+# 流式 JSON 字段提取：逐块读取响应，只取出顶层对象中需要的几个键
+# 不构建完整的字典，内存占用只与单个块和所取字段的长度有关，MicroPython 与 CPython 通用
+
+MAX_TOKEN = 64  # 单个键或值最多保留的字节数，所取字段的值超过时抛出 ValueError
+
+_ESCAPES = {0x62: 0x08, 0x66: 0x0c, 0x6e: 0x0a, 0x72: 0x0d, 0x74: 0x09}  # \b \f \n \r \t
+# 逐字节迭代得到的是整数，用整数元组判断，MicroPython 上 int in bytes 不可靠
+_WHITESPACE = (0x20, 0x09, 0x0d, 0x0a)
+_SCALAR_END = _WHITESPACE + (0x2c, 0x7d, 0x5d)  # , } ]
+
+
+def _parse_scalar(token):
+    if token == b'true':
+        return True
+    if token == b'false':
+        return False
+    if token == b'null':
+        return None
+    if b'.' in token or b'e' in token or b'E' in token:
+        return float(token)
+    return int(token)
+
+
+class FieldExtractor:
+    def __init__(self, keys):
+        self.wanted = [key.encode() for key in keys]
+        self.result = {}
+        self.depth = 0
+        self.expect_key = False  # 顶层对象中下一个字符串是键
+        self.key = None  # 顶层当前值对应的键（仅当是需要的键时）
+        self.in_string = False
+        self.escape = False
+        self.hex_left = 0  # \uXXXX 中还需要读取的十六进制位数
+        self.code = 0
+        self.capture = 0  # 0 不保留，1 保留键，2 保留字符串值，3 保留数字等标量
+        self.buf = bytearray()
+        self.overflow = False  # 当前保留的内容超过了 MAX_TOKEN
+
+    @property
+    def done(self):
+        return len(self.result) == len(self.wanted)
+
+    def keep(self, c):
+        if len(self.buf) < MAX_TOKEN:
+            self.buf.append(c)
+        else:
+            self.overflow = True
+
+    def start_capture(self, kind):
+        self.capture = kind
+        self.buf = bytearray()
+        self.overflow = False
+
+    def check_overflow(self):
+        # 截断的值可能是错误的数字或半个 UTF-8 字符，不能当作结果返回
+        if self.overflow:
+            raise ValueError('field %s longer than %d bytes' % (self.key.decode(), MAX_TOKEN))
+
+    def keep_code(self):
+        # 把 \uXXXX 转成 UTF-8 字节保存
+        if self.capture:
+            for c in chr(self.code).encode():
+                self.keep(c)
+
+    def finish_string(self):
+        if self.capture == 1:
+            # 超长的键不可能是需要的键
+            key = bytes(self.buf)
+            self.key = key if key in self.wanted and not self.overflow else None
+        elif self.capture == 2:
+            self.check_overflow()
+            self.result[self.key.decode()] = bytes(self.buf).decode()
+            self.key = None
+        self.capture = 0
+
+    def feed(self, chunk):
+        for c in chunk:
+            if self.in_string:
+                if self.hex_left:
+                    self.code = self.code * 16 + int(chr(c), 16)
+                    self.hex_left -= 1
+                    if not self.hex_left:
+                        self.keep_code()
+                elif self.escape:
+                    self.escape = False
+                    if c == 0x75:  # \u
+                        self.hex_left = 4
+                        self.code = 0
+                    elif self.capture:
+                        self.keep(_ESCAPES.get(c, c))
+                elif c == 0x5c:  # 反斜杠
+                    self.escape = True
+                elif c == 0x22:  # 引号
+                    self.in_string = False
+                    self.finish_string()
+                elif self.capture:
+                    self.keep(c)
+                continue
+            if self.capture == 3:
+                if c not in _SCALAR_END:
+                    self.keep(c)
+                    continue
+                self.check_overflow()
+                self.result[self.key.decode()] = _parse_scalar(bytes(self.buf))
+                self.key = None
+                self.capture = 0
+            if c in _WHITESPACE:
+                continue
+            top = self.depth == 1
+            if c == 0x22:
+                self.in_string = True
+                if top and self.expect_key:
+                    self.start_capture(1)
+                elif top and self.key is not None:
+                    self.start_capture(2)
+            elif c == 0x7b or c == 0x5b:  # { [
+                self.depth += 1
+                if self.depth == 1 and c == 0x7b:
+                    self.expect_key = True
+            elif c == 0x7d or c == 0x5d:  # } ]
+                self.depth -= 1
+                if top:
+                    self.key = None
+            elif c == 0x3a:  # 冒号
+                if top:
+                    self.expect_key = False
+            elif c == 0x2c:  # 逗号
+                if top:
+                    self.expect_key = True
+                    self.key = None
+            elif top and self.key is not None:
+                # 数字、true/false/null 的第一个字符
+                self.start_capture(3)
+                self.keep(c)
+
+
+def extract(read, keys, chunk_size=64):
+    """反复调用 read(chunk_size) 直到读完或取齐所有键，返回 {键: 值}"""
+    extractor = FieldExtractor(keys)
+    while not extractor.done:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        extractor.feed(chunk)
+    return extractor.result
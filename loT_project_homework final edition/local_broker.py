@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import struct
+
+# 本地 MQTT 3.1.1 代理，用于在电脑上联调和压测，不依赖外网的 broker.emqx.io
+# 支持 QoS 0/1、保留消息、遗嘱消息和 +/# 通配符，不支持持久会话和 QoS 2
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+def encode_length(length):
+    """MQTT 剩余长度的变长编码"""
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        out.append(byte)
+        if not length:
+            return bytes(out)
+
+def encode_string(value):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return struct.pack('!H', len(value)) + value
+
+def topic_matches(topic_filter, topic):
+    """判断主题是否匹配订阅过滤器"""
+    filter_parts = topic_filter.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(filter_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[i]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+class Session:
+    """一个客户端连接"""
+
+    def __init__(self, broker, reader, writer):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.client_id = None
+        self.subscriptions = {}  # 主题过滤器 -> QoS
+        self.will = None
+        self.next_id = 0
+
+    def send(self, packet_type, flags, body):
+        self.writer.write(bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body)
+
+    def deliver(self, topic, payload, qos, retain=False):
+        """把消息转发给该客户端"""
+        body = encode_string(topic)
+        if qos:
+            self.next_id = self.next_id % 65535 + 1
+            body += struct.pack('!H', self.next_id)
+        self.send(PUBLISH, (qos << 1) | (1 if retain else 0), body + payload)
+
+    async def read_packet(self):
+        header = await self.reader.readexactly(1)
+        length, shift = 0, 0
+        while True:
+            byte = (await self.reader.readexactly(1))[0]
+            length |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        body = await self.reader.readexactly(length) if length else b''
+        return header[0] >> 4, header[0] & 0x0f, body
+
+    def handle_connect(self, body):
+        pos = 2 + struct.unpack('!H', body[:2])[0]  # 跳过协议名
+        pos += 1  # 协议级别
+        flags = body[pos]
+        pos += 3  # 连接标志与保活时间
+        length = struct.unpack('!H', body[pos:pos + 2])[0]
+        self.client_id = body[pos + 2:pos + 2 + length].decode('utf-8')
+        pos += 2 + length
+        if flags & 0x04:
+            length = struct.unpack('!H', body[pos:pos + 2])[0]
+            will_topic = body[pos + 2:pos + 2 + length].decode('utf-8')
+            pos += 2 + length
+            length = struct.unpack('!H', body[pos:pos + 2])[0]
+            will_message = body[pos + 2:pos + 2 + length]
+            self.will = (will_topic, will_message, (flags >> 3) & 0x03, bool(flags & 0x20))
+        self.broker.register(self)
+        self.send(CONNACK, 0, b'\x00\x00')
+
+    def handle_publish(self, flags, body):
+        qos = (flags >> 1) & 0x03
+        length = struct.unpack('!H', body[:2])[0]
+        topic = body[2:2 + length].decode('utf-8')
+        pos = 2 + length
+        if qos:
+            packet_id = body[pos:pos + 2]
+            pos += 2
+            self.send(PUBACK, 0, packet_id)
+        self.broker.route(topic, body[pos:], qos, bool(flags & 0x01))
+
+    def handle_subscribe(self, body):
+        packet_id, pos = body[:2], 2
+        granted = bytearray()
+        new_filters = []
+        while pos < len(body):
+            length = struct.unpack('!H', body[pos:pos + 2])[0]
+            topic_filter = body[pos + 2:pos + 2 + length].decode('utf-8')
+            qos = min(body[pos + 2 + length], 1)
+            pos += 3 + length
+            self.subscriptions[topic_filter] = qos
+            granted.append(qos)
+            new_filters.append((topic_filter, qos))
+        self.send(SUBACK, 0, packet_id + bytes(granted))
+        for topic_filter, qos in new_filters:
+            self.broker.send_retained(self, topic_filter, qos)
+
+    def handle_unsubscribe(self, body):
+        packet_id, pos = body[:2], 2
+        while pos < len(body):
+            length = struct.unpack('!H', body[pos:pos + 2])[0]
+            self.subscriptions.pop(body[pos + 2:pos + 2 + length].decode('utf-8'), None)
+            pos += 2 + length
+        self.send(UNSUBACK, 0, packet_id)
+
+    async def run(self):
+        clean = False
+        try:
+            while True:
+                packet_type, flags, body = await self.read_packet()
+                if packet_type == CONNECT:
+                    self.handle_connect(body)
+                elif packet_type == PUBLISH:
+                    self.handle_publish(flags, body)
+                elif packet_type == SUBSCRIBE:
+                    self.handle_subscribe(body)
+                elif packet_type == UNSUBSCRIBE:
+                    self.handle_unsubscribe(body)
+                elif packet_type == PINGREQ:
+                    self.send(PINGRESP, 0, b'')
+                elif packet_type == DISCONNECT:
+                    clean = True
+                    break
+                # 客户端的 PUBACK 不做重传跟踪，直接忽略
+                if self.writer.transport.get_write_buffer_size() > 1 << 20:
+                    await self.writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.broker.unregister(self)
+            if not clean and self.will:
+                topic, message, qos, retain = self.will
+                self.broker.route(topic, message, qos, retain)
+            self.writer.close()
+
+class Broker:
+    def __init__(self, verbose=False):
+        self.sessions = {}
+        self.retained = {}
+        self.verbose = verbose
+        self.server = None
+
+    def register(self, session):
+        old = self.sessions.get(session.client_id)
+        if old is not None and old is not session:
+            # 相同 client_id 重复连接时踢掉旧连接
+            old.will = None
+            old.writer.close()
+        self.sessions[session.client_id] = session
+        if self.verbose:
+            print(f"客户端已连接: {session.client_id}")
+
+    def unregister(self, session):
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+            if self.verbose:
+                print(f"客户端已断开: {session.client_id}")
+
+    def route(self, topic, payload, qos, retain):
+        """把消息转发给所有匹配的订阅者"""
+        if retain:
+            if payload:
+                self.retained[topic] = (payload, qos)
+            else:
+                self.retained.pop(topic, None)
+        for session in list(self.sessions.values()):
+            granted = None
+            for topic_filter, sub_qos in session.subscriptions.items():
+                if topic_matches(topic_filter, topic):
+                    granted = max(granted or 0, sub_qos)
+            if granted is not None:
+                session.deliver(topic, payload, min(qos, granted))
+
+    def send_retained(self, session, topic_filter, qos):
+        for topic, (payload, msg_qos) in self.retained.items():
+            if topic_matches(topic_filter, topic):
+                session.deliver(topic, payload, min(qos, msg_qos), retain=True)
+
+    async def handle(self, reader, writer):
+        await Session(self, reader, writer).run()
+
+    async def start(self, host='127.0.0.1', port=1883):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def stop(self):
+        """停止监听并断开所有客户端"""
+        self.server.close()
+        for session in list(self.sessions.values()):
+            session.will = None
+            session.writer.close()
+        await self.server.wait_closed()
+
+async def serve(host, port, verbose):
+    broker = Broker(verbose)
+    server = await broker.start(host, port)
+    print(f"本地 MQTT 代理已启动: {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 MQTT 代理")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('-v', '--verbose', action='store_true', help="打印客户端连接与断开")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.verbose))
+    except KeyboardInterrupt:
+        print("本地 MQTT 代理已停止")
@@ -2,7 +2,11 @@ from machine import Pin, I2C
 import ssd1306
 import time
 import network
-import urequests
+from http_client import HTTPClient
+
+API_URL = "https://lot-dashboard-1.onrender.com/api/price_data"
+# 局域网内运行 price_server.py 时填写该电脑的地址，例如 "http://192.168.1.100:8080/api/price_data"
+LOCAL_API_URL = None
 
 # 设置 I2C
 i2c = I2C(0, scl=Pin(4), sda=Pin(5))
@@ -24,7 +28,8 @@ oled_height = 64
 
 # 使用正确的 I2C 地址，根据实际情况选择第一个
 addr = devices[0]
-oled = ssd1306.SSD1306_I2C(oled_width, oled_height, i2c, addr=addr)
+# double_buffer 保留上一帧，show() 只发送与上一帧不同的字节
+oled = ssd1306.SSD1306_I2C(oled_width, oled_height, i2c, addr=addr, double_buffer=True)
 
 #初始化Wi-Fi接口
 sta_if = network.WLAN(network.STA_IF)
@@ -53,15 +58,21 @@ if not sta_if.isconnected():
     print("Failed!")
 
 
+# 长连接复用，只在首次请求和连接断开后重新握手
+api = HTTPClient(LOCAL_API_URL or API_URL)
+
 while True:
-    # 发送HTTP请求获取API数据
-    response = urequests.get("https://lot-dashboard-1.onrender.com/api/price_data")
-    data = response.json()
-    response.close()  # 关闭连接释放资源
+    # 发送HTTP请求获取API数据（带 ETag / Last-Modified 的条件请求）
+    # 边读边取出需要的字段，不在堆上构建整个响应
+    data = api.get_fields(("current_price", "future_price"))
+    if data is None:
+        # 304 数据未变化，不解析也不重绘
+        time.sleep(10)
+        continue
 
     # 解析数据
     current_price = data.get("current_price", 0.0)
-    future_price = data.get("future_price", 0.0)
+    future_price = data.get("future_price", "N/A")  # 本地 price_server 没有预测价
 
     # 将读数显示到控制台
     oled.fill(0)
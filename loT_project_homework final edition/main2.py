@@ -2,14 +2,29 @@ from machine import Pin, I2C
 import ssd1306
 import time
 import network
-import urequests
 import json
+import select
+from umqtt.simple import MQTTClient
+from http_client import HTTPClient
+from wire_format import BINARY_SUFFIX, EPOCH_2000_OFFSET, decode_quote
 
 # MQTT配置
 MQTT_BROKER = "broker.emqx.io"
 MQTT_PORT = 1883
-MQTT_TOPIC_PUBLISH = "sc104/maotai"  # 发布主题
+MQTT_TOPIC_STATUS = "sc104/esp32/status"  # 设备状态主题（遗嘱消息）
 MQTT_TOPIC_SUBSCRIBE = "sc104/maotai"  # 订阅主题
+MQTT_USE_BINARY = False  # 为 True 时订阅二进制主题，省去设备上的 JSON 解析
+MQTT_TOPIC_BINARY = MQTT_TOPIC_SUBSCRIBE + BINARY_SUFFIX
+MQTT_KEEPALIVE = 60  # 保活时间（秒），空闲时每半个周期发一次心跳
+MQTT_TRACE = False  # 为 True 时每条消息显示后回报序号和时间，供 trace_collector.py 统计端到端延迟
+MQTT_TOPIC_TRACE = "sc104/esp32/trace"
+
+# 推送模式：订阅后阻塞等待消息，MQTT 静默超时后才退回 HTTP 轮询
+API_URL = "https://lot-dashboard-1.onrender.com/api/price_data"
+# 局域网内运行 price_server.py 时填写该电脑的地址，例如 "http://192.168.1.100:8080/api/price_data"
+LOCAL_API_URL = None
+MQTT_SILENCE_TIMEOUT = 120  # MQTT 超过该秒数没有消息时启用 HTTP 轮询
+HTTP_POLL_INTERVAL = 10  # HTTP 轮询间隔（秒）
 
 # 设置 I2C
 i2c = I2C(0, scl=Pin(4), sda=Pin(5), freq=400000)  # 增加I2C频率提高稳定性
@@ -31,7 +46,8 @@ oled_height = 64
 
 # 使用正确的 I2C 地址（确保地址正确，常见OLED地址为0x3C或0x3D）
 addr = devices[0]  # 建议手动确认地址，如0x3C
-oled = ssd1306.SSD1306_I2C(oled_width, oled_height, i2c, addr=addr)
+# double_buffer 保留上一帧，show() 只发送与上一帧不同的字节
+oled = ssd1306.SSD1306_I2C(oled_width, oled_height, i2c, addr=addr, double_buffer=True)
 
 # 初始化Wi-Fi接口
 sta_if = network.WLAN(network.STA_IF)
@@ -60,106 +76,161 @@ if not sta_if.isconnected():
     print("Failed to connect to WiFi!")
     raise SystemExit
 
-# MQTT回调函数
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
-        print("MQTT连接成功")
-        client.subscribe(MQTT_TOPIC_SUBSCRIBE)
+# 设备纪元：ESP32 上为 2000 年，在电脑上模拟运行时为 1970 年
+EPOCH_OFFSET = EPOCH_2000_OFFSET if time.gmtime(0)[0] == 2000 else 0
+
+if MQTT_TRACE:
+    # 端到端延迟要与发布者的时间戳相减，先用 NTP 校准时钟
+    try:
+        import ntptime
+        ntptime.settime()
+    except Exception as e:
+        print(f"NTP校时失败: {e}")
+
+def epoch_ms():
+    # Unix 纪元的毫秒时间戳
+    return time.time_ns() // 1000000 + EPOCH_OFFSET * 1000
+
+def fmt_price(value):
+    # 停牌、未开盘时发布者给出的价格为 null
+    return "--" if value is None else f"{value:.2f}"
+
+# 显示价格（JSON 消息可能来自发布者或 HTTP 接口，字段名不同）
+def show_price(title, data):
+    current_price = data.get('current_price', data.get('latest_price', 0.0))
+    oled.fill(0)
+    oled.text(title, 10, 10)
+    oled.text(f"CP: {fmt_price(current_price)}", 10, 30)
+    if 'future_price' in data:
+        oled.text(f"FP: {fmt_price(data['future_price'])}", 10, 50)
     else:
-        print(f"MQTT连接失败，返回码: {rc}")
+        oled.text(f"CHG: {fmt_price(data.get('change_percent', 0.0))}%", 10, 50)
+    oled.show()
 
-def on_message(client, userdata, msg):
+def show_binary_quote(payload):
+    # 二进制消息定长，直接 struct 解包，不需要构建 JSON 字典
+    quote = decode_quote(payload)
+    age = time.time() + EPOCH_OFFSET - quote['timestamp']
+    oled.fill(0)
+    oled.text("Maotai Price:", 10, 10)
+    oled.text(f"CP: {quote['latest_price']:.2f}", 10, 30)
+    oled.text(f"CHG: {quote['change_percent']:.2f}%", 10, 40)
+    oled.text(f"Age: {age}s", 10, 50)
+    oled.show()
+    return quote
+
+last_msg = time.ticks_ms()  # 最近一次收到 MQTT 消息的时间
+binary_topic = MQTT_TOPIC_BINARY.encode()
+
+def report_trace(topic, data):
+    # 屏幕刷新完成后回报：主题、发布者 epoch、序号和设备时间，由采集工具与发布时间对齐
+    t_dev = epoch_ms()
+    epoch = data.get('epoch')
+    client.publish(MQTT_TOPIC_TRACE, '{"topic": "%s", "epoch": %s, "seq": %d, "t_dev": %d}' % (
+        topic.decode(), 'null' if epoch is None else epoch, data['seq'], t_dev))
+
+# MQTT回调函数（umqtt 的主题和消息都是 bytes）
+def on_message(topic, msg):
+    global last_msg
+    last_msg = time.ticks_ms()
     try:
-        print(f"收到MQTT消息: {msg.topic} -> {msg.payload.decode()}")
-        json_data = json.loads(msg.payload.decode())
-        
-        # 清空屏幕并显示数据（确保价格为字符串类型）
-        oled.fill(0)
-        oled.text("Maotai Price:", 10, 10)
-        oled.text(f"Topic: {msg.topic}", 10, 25)
-        
-        # 格式化价格显示（保留两位小数）
-        cp = f"CP: {json_data.get('current_price', 0.0):.2f}"
-        fp = f"FP: {json_data.get('future_price', 0.0):.2f}"
-        
-        oled.text(cp, 10, 40)
-        oled.text(fp, 10, 50)
-        oled.show()
-        
+        if topic == binary_topic:
+            data = show_binary_quote(msg)
+        else:
+            print(f"收到MQTT消息: {topic} -> {msg}")
+            data = json.loads(msg)
+            show_price("Maotai Price:", data)
+        if MQTT_TRACE and 'seq' in data:
+            report_trace(topic, data)
     except Exception as e:
         print(f"处理MQTT消息错误: {e}")
         oled.fill(0)
         oled.text("Error!", 10, 40)
         oled.show()
 
-# 初始化MQTT客户端（增加遗嘱消息确保异常断开提示）
-client = network.mqtt.MQTTClient(
-    client_id="esp32_maotai_client",
-    server=MQTT_BROKER,
-    port=MQTT_PORT,
-    keepalive=60
-)
-
-# 设置回调函数
-client.set_callback(on_message)
-
-# 连接MQTT代理（增加异常处理）
-try:
-    client.connect()
-    print("已连接到MQTT代理")
+def connect_mqtt():
+    client = MQTTClient(
+        client_id="esp32_maotai_client",
+        server=MQTT_BROKER,
+        port=MQTT_PORT,
+        keepalive=MQTT_KEEPALIVE
+    )
+    client.set_callback(on_message)
+    client.set_last_will(MQTT_TOPIC_STATUS, b"Client disconnected")  # 遗嘱消息需在连接前设置
     client.connect()
+    client.subscribe(MQTT_TOPIC_BINARY if MQTT_USE_BINARY else MQTT_TOPIC_SUBSCRIBE)
     print("已连接到MQTT代理")
-    client.set_last_will(MQTT_TOPIC_PUBLISH, b"Client disconnected")  # 设置遗嘱消息
-except Exception as e:
-    oled.text("MQTT Error", 10, 40)
-    oled.show()
-    time.sleep(5)
-    raise SystemExit
+    return client
+
+api = HTTPClient(LOCAL_API_URL or API_URL)  # 长连接，多次轮询只做一次 TLS 握手
+
+def poll_http():
+    # 兜底：MQTT 长时间没有消息时直接向 HTTP 接口取数据
+    # 边读边取出需要的两个字段，不在堆上构建整个响应
+    data = api.get_fields(("current_price", "future_price"))
+    if data is None:
+        return  # 304 数据未变化，不解析也不重绘
+    print(f"HTTP数据: {data}")
+    show_price("API Data:", data)
+
+# 主循环：阻塞在 MQTT socket 上等待推送，只在需要发心跳或 HTTP 兜底时醒来
+ping_interval = MQTT_KEEPALIVE * 1000 // 2
+silence_timeout = MQTT_SILENCE_TIMEOUT * 1000
+http_interval = HTTP_POLL_INTERVAL * 1000
+client = None
+poller = select.poll()
+last_ping = time.ticks_ms()
+last_http = None
 
-# 主循环
 while True:
+    now = time.ticks_ms()
+    if time.ticks_diff(now, last_msg) >= silence_timeout:
+        if last_http is None or time.ticks_diff(now, last_http) >= http_interval:
+            last_http = now
+            try:
+                poll_http()
+            except Exception as e:
+                print(f"HTTP轮询错误: {e}")
+                oled.fill(0)
+                oled.text("API Error", 10, 40)
+                oled.show()
+
+    if client is None:
+        try:
+            client = connect_mqtt()
+            poller.register(client.sock, select.POLLIN)
+            last_ping = time.ticks_ms()
+        except Exception as e:
+            print(f"MQTT连接错误: {e}")
+            client = None
+            oled.fill(0)
+            oled.text("MQTT Error", 10, 40)
+            oled.show()
+            time.sleep(5)
+            continue
+
     try:
-        client.check_msg()  # 非阻塞式检查消息
-        
-        # 发送HTTP请求获取数据
-        response = urequests.get("https://lot-dashboard-1.onrender.com/api/price_data")
-        data = response.json()
-        response.close()
-        
-        # 解析数据（确保数据存在）
-        current_price = data.get("current_price", 0.0)
-        future_price = data.get("future_price", 0.0)
-        
-        # 发布数据到MQTT（格式化数值为字符串避免传输问题）
-        publish_data = {
-            "current_price": float(current_price),
-            "future_price": float(future_price),
-            "timestamp": time.time()
-        }
-        client.publish(MQTT_TOPIC_PUBLISH, json.dumps(publish_data))
-        print(f"已发布: {publish_data}")
-        
-        # 显示数据到OLED（确保价格为字符串类型）
-        oled.fill(0)
-        oled.text("API Data:", 10, 10)
-        oled.text(f"CP: {current_price:.2f}", 10, 30)
-        oled.text(f"FP: {future_price:.2f}", 10, 50)
-        oled.text("MQTT: Online", 10, 60)  # 显示在最后一行
-        oled.show()
-        
-        time.sleep(10)
-        
-    except urequests.exceptions.MissingSchema:
-        print("API地址错误")
-        oled.text("API Error", 10, 40)
-        oled.show()
-    except json.JSONDecodeError:
-        print("数据解析失败")
-        oled.text("JSON Error", 10, 40)
-        oled.show()
+        now = time.ticks_ms()
+        if time.ticks_diff(now, last_ping) >= ping_interval:
+            client.ping()
+            last_ping = now
+        # 可以阻塞的时长：到下一次心跳、静默超时或 HTTP 轮询为止
+        wait = ping_interval - time.ticks_diff(now, last_ping)
+        silence = time.ticks_diff(now, last_msg)
+        if silence < silence_timeout:
+            wait = min(wait, silence_timeout - silence)
+        elif last_http is not None:
+            wait = min(wait, http_interval - time.ticks_diff(now, last_http))
+        else:
+            wait = 0  # 静默刚在连接或心跳期间超时，还没轮询过 HTTP，立即回到循环开头去轮询
+        if poller.poll(max(wait, 0)):
+            client.wait_msg()  # 处理一条消息，心跳响应也在这里读掉
     except Exception as e:
-        print(f"主循环错误: {e}")
-        oled.fill(0)
-        oled.text("Main Error", 10, 40)
-        oled.show()
-        time.sleep(5)
\ No newline at end of file
+        # 除网络错误外，umqtt 在应答异常时还会抛出 MQTTException 或 AssertionError
+        print(f"MQTT连接断开: {e}")
+        poller.unregister(client.sock)
+        try:
+            client.sock.close()  # 设备上可用的 socket 很少，断开时必须关闭
+        except Exception:
+            pass
+        client = None
\ No newline at end of file
@@ -0,0 +1,246 @@
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+import paho.mqtt.client as mqtt
+
+# 可靠的发布通道：断线后按带抖动的指数退避自动重连，断线期间消息进入有界队列（可选落盘），
+# 重连后按原顺序补发；消息以 QoS 1 发送，收到 PUBACK 才从队列中移除，保证至少送达一次
+# paho 客户端只在本模块的网络线程中使用，每次重连都新建客户端，避免 paho 自身的重发与补发重复
+
+class Spool:
+    """队列的磁盘副本：追加写入消息记录（P）、队首确认记录（A）和队列满时的丢弃记录（D + 下标），
+    进程重启后回放恢复未确认的消息"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+
+    def load(self):
+        """回放记录，返回仍未确认的 (主题, 内容) 列表"""
+        pending = deque()
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        pos = 0
+        while pos < len(data):
+            kind = data[pos:pos + 1]
+            if kind == b'A':
+                if pending:
+                    pending.popleft()
+                pos += 1
+                continue
+            if kind == b'D':
+                if len(data) < pos + 5:
+                    break
+                index, = struct.unpack_from('>I', data, pos + 1)
+                if index < len(pending):
+                    del pending[index]
+                pos += 5
+                continue
+            if len(data) < pos + 7:
+                break  # 最后一条记录没有写完整
+            topic_len, payload_len = struct.unpack_from('>HI', data, pos + 1)
+            end = pos + 7 + topic_len + payload_len
+            if kind != b'P' or end > len(data):
+                break
+            topic = data[pos + 7:pos + 7 + topic_len].decode('utf-8')
+            pending.append((topic, data[pos + 7 + topic_len:end]))
+            pos = end
+        return pending
+
+    def append(self, topic, payload):
+        topic = topic.encode('utf-8')
+        self.file.write(b'P' + struct.pack('>HI', len(topic), len(payload)) + topic + payload)
+        self.file.flush()
+
+    def ack(self):
+        self.file.write(b'A')
+        self.file.flush()
+
+    def drop(self, index):
+        self.file.write(b'D' + struct.pack('>I', index))
+        self.file.flush()
+
+    def clear(self):
+        """队列清空时截断文件，避免无限增长"""
+        self.file.truncate(0)
+        self.file.seek(0)
+
+    def close(self):
+        self.file.close()
+
+class ReliablePublisher:
+    def __init__(self, broker, port=1883, client_id='', keepalive=60, max_queue=10000, max_inflight=100,
+                 spool=None, min_delay=0.5, max_delay=30, metrics=None):
+        self.broker = broker
+        self.port = port
+        self.client_id = client_id
+        self.keepalive = keepalive
+        self.max_queue = max_queue  # 未确认消息的上限，超过时丢弃
+        self.max_inflight = max_inflight  # 已发出但未收到 PUBACK 的消息上限
+        self.min_delay = min_delay  # 重连退避的起始秒数
+        self.max_delay = max_delay  # 重连退避的最大秒数
+        self.metrics = metrics  # 可选的 Metrics，记录从入队到收到 PUBACK 的耗时（阶段 ack）
+        self.spool = Spool(spool) if spool else None
+        # 每条消息为 [主题, 内容, 是否已确认, 入队时间]，按发布顺序排列，确认后从队首移除
+        self.pending = deque([topic, payload, False, time.perf_counter()] for topic, payload in
+                             (self.spool.load() if self.spool else ()))
+        self.next_send = 0  # pending 中下一条待发送消息的下标
+        self.inflight = {}  # paho mid -> 消息
+        self.lock = threading.RLock()
+        self.stopping = threading.Event()  # 停止时打断重连等待
+        self.connected = False
+        self.running = False
+        self.thread = None
+        self.published = 0
+        self.acked = 0
+        self.resent = 0  # 重连后重新发送的未确认消息
+        self.dropped = 0
+        self.reconnects = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, flush_timeout=5):
+        """等待队列发送完毕（最多 flush_timeout 秒）后断开"""
+        deadline = time.monotonic() + flush_timeout
+        while self.pending and self.connected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.running = False
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+        if self.spool:
+            self.spool.close()
+
+    def publish(self, topic, payload):
+        """放入发送队列，可在任意线程调用，不会阻塞；队列满时丢弃最旧的未发送消息，
+        队列中的消息都已发出、正在等待确认时丢弃新消息"""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        with self.lock:
+            self.published += 1
+            if len(self.pending) >= self.max_queue:
+                self.dropped += 1
+                if self.next_send >= len(self.pending):
+                    return
+                # 已发出的消息可能正在等待确认，不能移除，丢弃紧随其后的第一条未发送消息
+                del self.pending[self.next_send]
+                if self.spool:
+                    self.spool.drop(self.next_send)
+            self.pending.append([topic, payload, False, time.perf_counter()])
+            if self.spool:
+                self.spool.append(topic, payload)
+
+    def backoff(self, attempt):
+        """第 attempt 次重连前等待的秒数：指数增长，取上限的一半到全部之间的随机值"""
+        delay = min(self.max_delay, self.min_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def run(self):
+        attempt = 0
+        while self.running:
+            client = mqtt.Client(client_id=self.client_id)
+            client.on_connect = self.on_connect
+            client.on_disconnect = self.on_disconnect
+            client.on_publish = self.on_publish
+            try:
+                client.connect(self.broker, self.port, self.keepalive)
+                if self.session(client):
+                    attempt = 0
+            except OSError as e:
+                print(f"MQTT 连接失败: {e}")
+            self.connected = False
+            if not self.running:
+                break
+            delay = self.backoff(attempt)
+            attempt += 1
+            self.reconnects += 1
+            print(f"{delay:.1f} 秒后重连 MQTT Broker（第 {attempt} 次）")
+            self.stopping.wait(delay)
+
+    def session(self, client):
+        """运行一次连接直到断开，返回是否曾经连接成功"""
+        with self.lock:
+            # 新连接从队首开始补发所有未确认的消息
+            self.inflight.clear()
+            self.resent += self.next_send
+            self.next_send = 0
+        established = False
+        while self.running:
+            # 新消息只在每轮循环中发出，超时决定入队后最长的等待时间
+            rc = client.loop(timeout=0.01)
+            if rc != mqtt.MQTT_ERR_SUCCESS:
+                break
+            if self.connected:
+                established = True
+                self.send_pending(client)
+            elif established:
+                break
+        if not self.running and self.connected:
+            client.disconnect()
+            client.loop(timeout=0.1)
+        return established
+
+    def send_pending(self, client):
+        with self.lock:
+            while self.next_send < len(self.pending) and len(self.inflight) < self.max_inflight:
+                message = self.pending[self.next_send]
+                if message[2]:
+                    # 上次连接中已确认，只是排在未确认的消息之后
+                    self.next_send += 1
+                    continue
+                info = client.publish(message[0], message[1], qos=1)
+                if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                    break
+                self.inflight[info.mid] = message
+                self.next_send += 1
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.connected = True
+            print(f"发布通道已连接到 MQTT Broker: {self.broker}，待发送 {len(self.pending)} 条")
+        else:
+            print(f"连接失败，返回码: {rc}")
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        if rc != 0:
+            print(f"与 MQTT Broker 的连接断开，返回码: {rc}")
+
+    def on_publish(self, client, userdata, mid):
+        """收到 PUBACK：标记确认，并移除队首连续已确认的消息"""
+        with self.lock:
+            message = self.inflight.pop(mid, None)
+            if message is None:
+                return
+            message[2] = True
+            self.acked += 1
+            if self.metrics is not None:
+                self.metrics.observe('ack', time.perf_counter() - message[3])
+            while self.pending and self.pending[0][2]:
+                self.pending.popleft()
+                self.next_send -= 1
+                if self.spool:
+                    self.spool.ack()
+            if self.spool and not self.pending:
+                self.spool.clear()
+
+    def is_connected(self):
+        return self.connected
+
+    def stats(self):
+        with self.lock:
+            return {
+                'published': self.published,
+                'acked': self.acked,
+                'queued': len(self.pending),
+                'inflight': len(self.inflight),
+                'resent': self.resent,
+                'dropped': self.dropped,
+                'reconnects': self.reconnects,
+            }
@@ -0,0 +1,127 @@
+import os
+import struct
+import threading
+import time
+import zlib
+
+# 上游原始响应的录制日志：只追加写入，便于复现压测和排查异常行情
+# 文件以 MAGIC 开头，之后是若干压缩块；每块为 块头（压缩后长度、CRC32）+ zlib 压缩的若干条记录
+# 记录为 记录头（接收时间、来源接口、响应体长度）+ 原始响应体
+# 记录先在内存中攒成块再压缩写入，进程崩溃最多丢失最后一个未写入的块；
+# 写了一半的块在重新打开录制时截掉，之后追加的块才能被读到
+
+MAGIC = b'PLOG1\n'
+BLOCK_HEADER = '>II'
+RECORD_HEADER = '>dBI'
+BLOCK_HEADER_SIZE = struct.calcsize(BLOCK_HEADER)
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER)
+
+# 来源接口
+SOURCE_STOCK = 0  # 单只股票接口 stock/get
+SOURCE_LIST = 1  # 批量接口 ulist.np/get
+
+class PayloadLog:
+    """录制端，append 可在多个抓取线程中调用"""
+
+    def __init__(self, path, block_size=256 * 1024, flush_interval=5, level=6):
+        self.path = path
+        self.block_size = block_size  # 未压缩数据达到该字节数时写入一块
+        self.flush_interval = flush_interval  # 距上次写入超过该秒数时也写入一块
+        self.level = level
+        valid = valid_length(path) if os.path.exists(path) else 0
+        self.file = open(path, 'ab')
+        if self.file.tell() != valid:
+            # 上次录制中断留下的不完整的块
+            self.file.truncate(valid)
+        if valid == 0:
+            self.file.write(MAGIC)
+            self.file.flush()
+        self.buffer = []
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.records = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+
+    def append(self, source, received, payload):
+        """记录一次上游响应：来源接口、接收时间（Unix 秒）和原始响应体"""
+        with self.lock:
+            self.buffer.append(struct.pack(RECORD_HEADER, received, source, len(payload)))
+            self.buffer.append(payload)
+            self.buffered += RECORD_HEADER_SIZE + len(payload)
+            self.records += 1
+            if self.buffered >= self.block_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._write_block()
+
+    def flush(self):
+        with self.lock:
+            self._write_block()
+
+    def _write_block(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        data = zlib.compress(b''.join(self.buffer), self.level)
+        self.file.write(struct.pack(BLOCK_HEADER, len(data), zlib.crc32(data)) + data)
+        self.file.flush()
+        self.raw_bytes += self.buffered
+        self.written_bytes += len(data) + BLOCK_HEADER_SIZE
+        self.buffer = []
+        self.buffered = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'records': self.records,
+                'raw_bytes': self.raw_bytes,
+                'written_bytes': self.written_bytes,
+                'ratio': round(self.raw_bytes / self.written_bytes, 2) if self.written_bytes else None,
+            }
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def _blocks(f):
+    """从 MAGIC 之后逐块返回压缩数据和块结束的位置，遇到不完整或损坏的块时停止"""
+    while True:
+        header = f.read(BLOCK_HEADER_SIZE)
+        if len(header) < BLOCK_HEADER_SIZE:
+            return
+        length, crc = struct.unpack(BLOCK_HEADER, header)
+        data = f.read(length)
+        if len(data) < length or zlib.crc32(data) != crc:
+            return  # 进程中断时写了一半的块
+        yield data, f.tell()
+
+def valid_length(path):
+    """文件中完整部分的长度（最后一个完整块的结尾）；连 MAGIC 都没写完时为 0"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            if MAGIC.startswith(magic):
+                return 0
+            raise ValueError(f"{path} 不是录制日志文件")
+        end = len(MAGIC)
+        for _, end in _blocks(f):
+            pass
+        return end
+
+def read_log(path):
+    """按写入顺序逐条返回 (来源接口, 接收时间, 原始响应体)，遇到不完整或损坏的块时停止"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} 不是录制日志文件")
+        for data, _ in _blocks(f):
+            block = zlib.decompress(data)
+            pos = 0
+            while pos < len(block):
+                received, source, size = struct.unpack_from(RECORD_HEADER, block, pos)
+                pos += RECORD_HEADER_SIZE
+                yield source, received, block[pos:pos + size]
+                pos += size
+
+def is_payload_log(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
@@ -0,0 +1,179 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from email.utils import formatdate
+
+from publish import MaotaiFuturesSpider
+
+# 局域网内的 /api/price_data 服务，代替远程的 lot-dashboard（免费主机冷启动要十几秒）
+# 每只股票的最新行情在更新时就序列化成完整的 HTTP 响应（含响应头），请求到来时直接写出
+# 支持 keep-alive 和 If-None-Match 条件请求，与设备端 HTTPClient 配合使用
+
+PATH = '/api/price_data'
+MAX_HEADER = 8192
+IDLE_TIMEOUT = 75  # 空闲连接保持的秒数
+
+def build_response(status, reason, body=b'', headers=()):
+    lines = [f'HTTP/1.1 {status} {reason}', f'Content-Length: {len(body)}']
+    lines.extend(headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+NOT_FOUND = build_response(404, 'Not Found', b'{"error": "not found"}', ('Content-Type: application/json',))
+NOT_READY = build_response(503, 'Service Unavailable', b'{"error": "no data yet"}',
+                           ('Content-Type: application/json', 'Retry-After: 5'))
+BAD_REQUEST = build_response(400, 'Bad Request', headers=('Connection: close',))
+
+def price_body(quote):
+    """响应体与原 dashboard 接口兼容：current_price / future_price"""
+    body = {
+        'symbol': quote.get('secid'),
+        'name': quote.get('name'),
+        'current_price': quote.get('latest_price'),
+        'change_percent': quote.get('change_percent'),
+        'update_time': quote.get('update_time'),
+    }
+    # 本地没有预测模型，上游给出 future_price 时原样转发，否则不返回该字段
+    if quote.get('future_price') is not None:
+        body['future_price'] = quote['future_price']
+    return body
+
+class PriceCache:
+    """每只股票最新行情对应的预先序列化好的 200 / 304 响应"""
+
+    def __init__(self, default=None):
+        self.default = default  # 请求未指定 secid 时返回的股票
+        self.entries = {}  # secid -> (etag, 200 响应, 304 响应)
+
+    def update(self, quotes):
+        """用一批行情刷新缓存，可在任意线程调用：每个条目整体替换，读取方不会看到中间状态"""
+        for quote in quotes:
+            secid = quote.get('secid')
+            if not secid or not isinstance(quote.get('latest_price'), (int, float)):
+                continue
+            body = price_body(quote)
+            # ETag 由行情内容（不含每轮都变的 update_time）算出，行情没变时保留原条目，
+            # 设备的条件请求继续得到 304；update_time 即为行情最近一次变化的时间
+            content = json.dumps(dict(body, update_time=None), ensure_ascii=False, sort_keys=True)
+            etag = '"%s"' % hashlib.md5(content.encode('utf-8')).hexdigest()[:16]
+            entry = self.entries.get(secid)
+            if entry is not None and entry[0] == etag.encode():
+                continue
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            headers = (f'ETag: {etag}', f'Last-Modified: {formatdate(usegmt=True)}', 'Cache-Control: no-cache')
+            self.entries[secid] = (
+                etag.encode(),
+                build_response(200, 'OK', body, ('Content-Type: application/json; charset=utf-8',) + headers),
+                build_response(304, 'Not Modified', headers=headers),
+            )
+            if self.default is None:
+                self.default = secid
+
+    def lookup(self, secid):
+        return self.entries.get(secid or self.default)
+
+class PriceServer:
+    def __init__(self, cache):
+        self.cache = cache
+        self.server = None
+        self.requests = 0
+        self.connections = 0
+
+    def respond(self, head):
+        """根据请求头选出预先生成的响应，返回 (响应, 是否保持连接)"""
+        request_line, _, rest = head.partition(b'\r\n')
+        parts = request_line.split()
+        if len(parts) != 3:
+            return BAD_REQUEST, False
+        path, _, query = parts[1].partition(b'?')
+        headers = rest.lower()
+        keep_alive = b'connection: close' not in headers
+        if parts[2] == b'HTTP/1.0':
+            keep_alive = b'connection: keep-alive' in headers
+        if path.decode('latin-1') != PATH:
+            return NOT_FOUND, keep_alive
+        secid = None
+        for pair in query.split(b'&'):
+            key, _, value = pair.partition(b'=')
+            if key == b'secid':
+                secid = value.decode('latin-1')
+        entry = self.cache.lookup(secid)
+        if entry is None:
+            return NOT_READY, keep_alive
+        etag, ok, not_modified = entry
+        if b'if-none-match: ' + etag in headers:
+            return not_modified, keep_alive
+        return ok, keep_alive
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                    break
+                response, keep_alive = self.respond(head)
+                self.requests += 1
+                writer.write(response)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='0.0.0.0', port=8080):
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER, backlog=2048)
+        return self.server
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+async def refresh(spider, cache, interval, publish=False):
+    """按固定周期在线程池中抓取行情并刷新缓存，可选同时发布到 MQTT"""
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while True:
+        start = time.time()
+        try:
+            quotes = await loop.run_in_executor(spider.executor, spider.get_all_quotes)
+            cache.update(quotes)
+            if publish:
+                spider.publish_quotes(quotes)
+            print(f"已更新 {len(quotes)} 只股票，耗时 {time.time() - start:.2f}s")
+        except Exception as e:
+            print(f"刷新行情失败: {e}")
+        next_tick = max(next_tick + interval, loop.time())
+        await asyncio.sleep(next_tick - loop.time())
+
+async def serve(args):
+    spider = MaotaiFuturesSpider(watchlist=args.secids or None)
+    if args.publish:
+        spider.connect_mqtt()
+    cache = PriceCache(default=spider.watchlist[0])
+    server = PriceServer(cache)
+    await server.start(args.host, args.port)
+    print(f"价格接口已启动: http://{args.host}:{args.port}{PATH}")
+    try:
+        await refresh(spider, cache, args.interval, args.publish)
+    finally:
+        await server.stop()
+        if args.publish:
+            spider.disconnect_mqtt()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="局域网价格数据接口")
+    parser.add_argument('secids', nargs='*', help="自选股列表，第一只为默认返回的股票")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--interval', type=float, default=10, help="抓取周期（秒）")
+    parser.add_argument('--publish', action='store_true', help="同时把行情发布到 MQTT")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("价格接口已停止")
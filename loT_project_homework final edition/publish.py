@@ -1,76 +1,570 @@
 import requests
+import argparse
+import asyncio
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import paho.mqtt.client as mqtt
 import json
+import struct
+from metrics import Metrics, serve_metrics
+from mqtt_transport import ReliablePublisher
+from payload_log import SOURCE_LIST, SOURCE_STOCK, PayloadLog
+from publish_filter import PublishFilter
+from quote_cache import QuoteCache
+from scheduler import PollScheduler, parse_holidays
+from wire_format import BINARY_SUFFIX, encode_quote
+
+try:
+    from indicators import INDICATOR_SUFFIX, IndicatorEngine
+except ImportError:
+    # 指标计算依赖 NumPy，未安装时只是不能启用 --indicators
+    IndicatorEngine = None
+
+# 默认自选股列表（secid 格式: 市场.代码，1=沪市 0=深市）
+DEFAULT_WATCHLIST = ['1.600519']
+
+# 发布后超过该秒数仍未触发 on_publish 的记录不再等待（断线时调用 publish 的消息不会触发）
+ACK_TIMEOUT = 60
+
+# 原请求使用的完整字段列表，仅作为基准测试的对照
+LEGACY_FIELDS = 'f43,f57,f58,f169,f170,f46,f44,f51,f168,f47,f164,f163,f116,f60,f45,f52,f50,f48,f167,f117,f71,f161,f49,f530,f135,f136,f137,f138,f139,f141,f142,f144,f145,f147,f148,f140,f143,f146,f149,f55,f62,f162,f92,f173,f104,f105,f84,f85,f183,f184,f185,f186,f187,f188,f189,f190,f191,f192,f107,f111,f86,f177,f78,f110,f262,f263,f264,f267,f268,f250,f251,f252,f253,f254,f255,f256,f257,f258,f266,f269,f270,f271,f273,f274,f275,f127,f199,f128,f193,f196,f194,f195,f197,f80,f280,f281,f282,f284,f285,f286,f287,f292'
+
+# 字段投影：每个档位声明解析时读取的字段及输出键名，请求的 fields 参数由启用的档位生成
+# 单只股票接口 (stock/get)
+STOCK_FIELD_PROFILES = {
+    'basic': {'f57': 'name', 'f43': 'latest_price', 'f169': 'change_amount', 'f170': 'change_percent'},
+    'volume': {'f47': 'volume', 'f48': 'amount'},  # 成交量、成交额
+    # 资金流向：主力/超大单/大单/中单/小单 的流入、流出与净流入
+    'capital_flow': {
+        'f135': 'main_in', 'f136': 'main_out', 'f137': 'main_net',
+        'f138': 'xl_in', 'f139': 'xl_out', 'f140': 'xl_net',
+        'f141': 'l_in', 'f142': 'l_out', 'f143': 'l_net',
+        'f144': 'm_in', 'f145': 'm_out', 'f146': 'm_net',
+        'f147': 's_in', 'f148': 's_out', 'f149': 's_net',
+    },
+}
+# 批量接口 (ulist.np/get)，字段编号与单只股票接口不同
+LIST_FIELD_PROFILES = {
+    'basic': {'f12': 'code', 'f13': 'market', 'f14': 'name', 'f2': 'latest_price', 'f4': 'change_amount', 'f3': 'change_percent'},
+    'volume': {'f5': 'volume', 'f6': 'amount'},
+    # 资金流向：批量接口只提供各档的净流入，键名与单只股票接口相同
+    'capital_flow': {'f62': 'main_net', 'f66': 'xl_net', 'f72': 'l_net', 'f78': 'm_net', 'f84': 's_net'},
+}
+# 单只股票接口的价格字段以分为单位
+STOCK_PRICE_SCALE = {'latest_price': 100, 'change_amount': 100}
+# 批量接口中按数值解析的基础字段，停牌时为 '-'；代码、名称缺失时记为 'N/A'，其余原样输出
+LIST_NUMERIC_KEYS = ('latest_price', 'change_amount', 'change_percent')
+LIST_TEXT_KEYS = ('code', 'name')
+
+def build_fields(profiles, table):
+    """按启用的档位汇总需要请求的字段，保持声明顺序并去重"""
+    fields = []
+    for name in profiles:
+        for code in table.get(name, {}):
+            if code not in fields:
+                fields.append(code)
+    return ','.join(fields)
+
+def extra_fields(raw_data, profiles, table):
+    """按扩展档位的声明原样取出字段值"""
+    result = {}
+    for name in profiles:
+        if name == 'basic':
+            continue
+        for code, key in table.get(name, {}).items():
+            result[key] = raw_data.get(code)
+    return result
+
+def format_time(timestamp=None):
+    """行情的更新时间；回放录制数据时使用录制时的接收时间"""
+    moment = datetime.now() if timestamp is None else datetime.fromtimestamp(timestamp)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+def _num(value, digits=2):
+    """把接口返回的数值转为浮点数，停牌、未开盘等情况返回的 '-' 记为 None（没有价格），由使用方跳过"""
+    try:
+        return round(float(value), digits)
+    except (TypeError, ValueError):
+        return None
 
 class MaotaiFuturesSpider:
-    def __init__(self):
+    def __init__(self, watchlist=None, batch_size=100, max_workers=4, profiles=('basic',),
+                 publish_filter=None, binary=False, indicators=None, cache=None,
+                 scheduler=None, reliable=False, spool=None, stats_interval=None, recorder=None,
+                 split_topics=None, broker="broker.emqx.io", port=1883):
         self.session = requests.Session()
+        # 连接池大小与并发数一致，避免并发请求时反复建连
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Referer": "https://quote.eastmoney.com/"
         }
         self.api_url = "https://push2.eastmoney.com/api/qt/stock/get"
+        # 批量行情接口，一次请求可返回多只股票
+        self.list_api_url = "https://push2.eastmoney.com/api/qt/ulist.np/get"
+        
+        # 自选股配置
+        self.watchlist = list(watchlist or DEFAULT_WATCHLIST)
+        self.batch_size = batch_size  # 每个批量请求包含的股票数
+        self.max_workers = max_workers  # 同时进行的批量请求数上限
+        # 启用的字段档位，basic 始终启用；两个接口都要有该档位的字段声明，否则批量抓取时会静默缺字段
+        unknown = [p for p in profiles if p not in STOCK_FIELD_PROFILES or p not in LIST_FIELD_PROFILES]
+        if unknown:
+            raise ValueError(f"未知的字段档位: {', '.join(unknown)}")
+        self.profiles = ('basic',) + tuple(p for p in profiles if p != 'basic')
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # 发布前的变化检测，为 None 时每轮都全部发布
+        self.publish_filter = publish_filter
+        # 是否同时在 <主题>/bin 上发布二进制格式
+        self.binary = binary
+        # 指标计算（IndicatorEngine），为 None 时不发布指标
+        self.indicators = indicators
+        # 共享的行情缓存（QuoteCache），为 None 时每次都请求上游
+        self.cache = cache
+        # 按交易时段和价格变化决定抓取间隔（PollScheduler），为 None 时使用固定间隔
+        self.scheduler = scheduler
+        # 录制上游原始响应（PayloadLog），为 None 时不录制
+        self.recorder = recorder
+        # 是否按代码拆分子主题，为 None 时由自选股数量决定；分片运行时由整体自选股数量决定
+        self.split_topics = split_topics
+        # 各阶段耗时与错误计数，常开；stats_interval 不为 None 时定期发布到 <主题>/stats
+        self.metrics = Metrics()
+        self.stats_interval = stats_interval
+        self.last_stats = time.monotonic()
         
         # MQTT 配置
-        self.broker = "broker.emqx.io"
-        self.port = 1883
+        self.broker = broker
+        self.port = port
         self.topic = "sc104/maotai"
-        self.client = mqtt.Client()
+        if reliable:
+            # 自动重连，断线期间的消息排队（可写入 spool 文件）并在重连后按顺序以 QoS 1 补发
+            self.client = ReliablePublisher(self.broker, self.port, spool=spool, metrics=self.metrics)
+        else:
+            self.client = mqtt.Client()
+            self.client.on_publish = self.on_publish
+        self.publish_times = OrderedDict()  # mid -> 调用 publish 的时间，按登记顺序排列，用于统计发布到确认的耗时
+        self.sequences = {}  # 主题 -> 最近一条消息的序号，用于端到端追踪和检测丢消息
+        # 发布者进程的标识（启动时刻的毫秒数，取低 32 位），随消息发出；
+        # 重启或股票迁移到其他分片后序号从 1 重新开始，接收端据此区分，不当成重复或丢失
+        self.epoch = int(time.time() * 1000) & 0xffffffff
+        self.publish_lock = threading.Lock()
         
     def connect_mqtt(self):
         """连接到MQTT服务器"""
+        if isinstance(self.client, ReliablePublisher):
+            # 在后台线程中连接，首次连接失败也会按退避间隔重试
+            self.client.start()
+            return
         self.client.connect(self.broker, self.port)
+        # 启动后台网络线程，负责收发 ACK 与心跳，publish 不再阻塞
+        self.client.loop_start()
         print(f"发布者已连接到 MQTT Broker: {self.broker}")
+
+    def disconnect_mqtt(self):
+        """断开MQTT连接并停止网络线程"""
+        if isinstance(self.client, ReliablePublisher):
+            self.client.stop()
+            return
+        self.client.disconnect()
+        self.client.loop_stop()
         
+    def send(self, topic, payload):
+        """发布一条消息并记录耗时；普通客户端在 on_publish 中统计到发出（QoS 1 时为收到确认）的耗时"""
+        with self.metrics.timer('publish'):
+            if isinstance(self.client, ReliablePublisher):
+                self.client.publish(topic, payload)
+            else:
+                # 持锁发布并登记 mid，避免网络线程先于登记触发 on_publish
+                with self.publish_lock:
+                    info = self.client.publish(topic, payload)
+                    now = time.perf_counter()
+                    self.publish_times[info.mid] = now
+                    self.publish_times.move_to_end(info.mid)  # mid 循环使用，重新登记的排到末尾
+                    while now - next(iter(self.publish_times.values())) > ACK_TIMEOUT:
+                        self.publish_times.popitem(last=False)
+        self.metrics.count('messages_published')
+
+    def on_publish(self, client, userdata, mid):
+        with self.publish_lock:
+            start = self.publish_times.pop(mid, None)
+        if start is not None:
+            self.metrics.observe('ack', time.perf_counter() - start)
+
     def get_maotai_futures_data(self):
-        """获取并解析茅台股票数据"""
+        """获取茅台股票数据，启用缓存时优先从缓存读取；过期时等待刷新，不发布上一轮的旧值"""
+        if self.cache is None:
+            return self.fetch_maotai_futures_data()
+        key = ('1.600519', build_fields(self.profiles, STOCK_FIELD_PROFILES))
+        return self.cache.get(key, self.fetch_maotai_futures_data, stale=False)
+
+    def fetch_maotai_futures_data(self):
+        """请求上游并解析茅台股票数据"""
         params = {
             'secid': '1.600519',  # 贵州茅台股票代码
-            'fields': 'f43,f57,f58,f169,f170,f46,f44,f51,f168,f47,f164,f163,f116,f60,f45,f52,f50,f48,f167,f117,f71,f161,f49,f530,f135,f136,f137,f138,f139,f141,f142,f144,f145,f147,f148,f140,f143,f146,f149,f55,f62,f162,f92,f173,f104,f105,f84,f85,f183,f184,f185,f186,f187,f188,f189,f190,f191,f192,f107,f111,f86,f177,f78,f110,f262,f263,f264,f267,f268,f250,f251,f252,f253,f254,f255,f256,f257,f258,f266,f269,f270,f271,f273,f274,f275,f127,f199,f128,f193,f196,f194,f195,f197,f80,f280,f281,f282,f284,f285,f286,f287,f292',
+            'fields': build_fields(self.profiles, STOCK_FIELD_PROFILES),  # 只请求解析需要的字段
             'invt': '2',
             'fltt': '2',
             '_': int(time.time() * 1000)
         }
 
         try:
-            response = self.session.get(self.api_url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            if data.get('data'):
-                return self.parse_data(data['data'])
-            return None
+            with self.metrics.timer('http'):
+                response = self.session.get(self.api_url, headers=self.headers, params=params, timeout=10)
+                response.raise_for_status()
+            received = round(time.time(), 3)  # 上游响应到达的时间
+            if self.recorder is not None:
+                self.recorder.append(SOURCE_STOCK, received, response.content)
+            quote = self.parse_stock_response(response.content, received)
+            if quote is not None:
+                self.metrics.count('quotes_fetched')
+            return quote
         except Exception as e:
             print(f"获取数据失败: {e}")
             return None
 
-    def parse_data(self, raw_data):
+    def parse_stock_response(self, body, received):
+        """解析单只股票接口的原始响应体，实时抓取与录制回放共用"""
+        with self.metrics.timer('decode'):
+            data = json.loads(body)
+        if not data.get('data'):
+            return None
+        with self.metrics.timer('parse'):
+            quote = self.parse_data(data['data'], received)
+        quote['t_recv'] = received
+        return quote
+
+    def parse_data(self, raw_data, received=None):
         """解析数据并格式化为JSON"""
-        return {
-            'name': raw_data.get('f57', 'N/A'),  # 股票名称
-            'latest_price': round(raw_data.get('f43', 0) / 100, 2),  # 最新价格
-            'change_amount': round(raw_data.get('f169', 0) / 100, 2),  # 涨跌额
-            'change_percent': round(raw_data.get('f170', 0), 2),  # 涨跌幅百分比
-            'update_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # 更新时间
+        data = {}
+        for code, key in STOCK_FIELD_PROFILES['basic'].items():
+            if key == 'name':
+                data[key] = raw_data.get(code, 'N/A')
+            else:
+                data[key] = round(raw_data.get(code, 0) / STOCK_PRICE_SCALE.get(key, 1), 2)
+        data['update_time'] = format_time(received)  # 更新时间
+        data.update(extra_fields(raw_data, self.profiles, STOCK_FIELD_PROFILES))
+        return data
+
+    def get_quotes_batch(self, secids):
+        """批量获取多只股票的行情，启用缓存时只请求未命中或已过期的股票"""
+        if self.cache is None:
+            return self.fetch_quotes_batch(secids)
+        fields = build_fields(self.profiles, LIST_FIELD_PROFILES)
+
+        def fetch(keys):
+            quotes = self.fetch_quotes_batch([secid for secid, _ in keys])
+            return {(quote['secid'], fields): quote for quote in quotes}
+
+        # 发布循环每轮都要最新的数据，过期的键阻塞刷新，不走先返回旧值的路径
+        quotes = self.cache.get_many([(secid, fields) for secid in secids], fetch, stale=False)
+        return [quote for quote in quotes if quote is not None]
+
+    def fetch_quotes_batch(self, secids):
+        """通过批量接口一次获取多只股票的行情"""
+        params = {
+            'secids': ','.join(secids),
+            'fields': build_fields(self.profiles, LIST_FIELD_PROFILES),
+            'invt': '2',
+            'fltt': '2',
+            'np': '1',  # 以列表形式返回 diff
+            '_': int(time.time() * 1000)
         }
 
-    def publish_data(self):
+        try:
+            with self.metrics.timer('http'):
+                response = self.session.get(self.list_api_url, headers=self.headers, params=params, timeout=10)
+                response.raise_for_status()
+            received = round(time.time(), 3)  # 上游响应到达的时间
+            if self.recorder is not None:
+                self.recorder.append(SOURCE_LIST, received, response.content)
+            quotes = self.parse_list_response(response.content, received)
+            self.metrics.count('quotes_fetched', len(quotes))
+            return quotes
+        except Exception as e:
+            print(f"批量获取数据失败 ({len(secids)} 只): {e}")
+            return []
+
+    def parse_list_response(self, body, received):
+        """解析批量接口的原始响应体，实时抓取与录制回放共用"""
+        with self.metrics.timer('decode'):
+            data = json.loads(body)
+        with self.metrics.timer('parse'):
+            diff = (data.get('data') or {}).get('diff') or []
+            if isinstance(diff, dict):
+                diff = list(diff.values())
+            quotes = [self.parse_list_item(item, received) for item in diff]
+            for quote in quotes:
+                quote['t_recv'] = received
+        return quotes
+
+    def parse_list_item(self, item, received=None):
+        """解析批量接口中的单只股票数据"""
+        data = {'secid': f"{item.get('f13')}.{item.get('f12')}"}  # 市场.代码
+        for code, key in LIST_FIELD_PROFILES['basic'].items():
+            if key in LIST_NUMERIC_KEYS:
+                data[key] = _num(item.get(code))
+            elif key in LIST_TEXT_KEYS:
+                data[key] = item.get(code, 'N/A')
+            else:
+                data[key] = item.get(code)
+        data['update_time'] = format_time(received)  # 更新时间
+        data.update(extra_fields(item, self.profiles, LIST_FIELD_PROFILES))
+        return data
+
+    def get_batches(self):
+        """把自选股列表按 batch_size 切分成若干批"""
+        return [self.watchlist[i:i + self.batch_size]
+                for i in range(0, len(self.watchlist), self.batch_size)]
+
+    def get_all_quotes(self):
+        """按批次并发获取整个自选股列表的行情"""
+        batches = self.get_batches()
+        if len(batches) <= 1:
+            return self.get_quotes_batch(batches[0]) if batches else []
+        # 并发数受 max_workers 限制，避免对上游造成过大压力
+        results = self.executor.map(self.get_quotes_batch, batches)
+        return [quote for batch in results for quote in batch]
+
+    def splits_topics(self):
+        if self.split_topics is not None:
+            return self.split_topics
+        return len(self.watchlist) > 1
+
+    def topic_for(self, quote):
+        """单只股票沿用原主题，多只股票时按代码拆分子主题"""
+        if not self.splits_topics():
+            return self.topic
+        return f"{self.topic}/{quote['code']}"
+
+    def indicator_topic_for(self, quote):
+        """指标发布在行情主题的平行子主题上"""
+        topic = self.topic + INDICATOR_SUFFIX
+        if not self.splits_topics():
+            return topic
+        return f"{topic}/{quote['code']}"
+
+    def publish_indicators(self, quotes):
+        """用本批行情更新指标并发布，不受变化检测影响"""
+        # 停牌、未开盘的行情没有价格（latest_price 为 None），不能进入指标窗口
+        quotes = [q for q in quotes if q.get('latest_price') is not None]
+        if not quotes:
+            return
+        topics = [self.indicator_topic_for(q) for q in quotes]
+        # 没有成交量（未启用 volume 档位或停牌返回 '-'）时记为 None，该股票的 VWAP 为 None
+        volumes = [q.get('volume') if isinstance(q.get('volume'), (int, float)) else None for q in quotes]
+        with self.metrics.timer('indicators'):
+            rows = self.indicators.update(topics, [q['latest_price'] for q in quotes], volumes)
+            results = self.indicators.to_dicts(rows)
+        for topic, quote, values in zip(topics, quotes, results):
+            values['name'] = quote.get('name')
+            values['update_time'] = quote.get('update_time')
+            self.send(topic, json.dumps(values, ensure_ascii=False))
+
+    def publish_quotes(self, quotes):
+        """把一批行情逐条发布，每只股票单独一条消息"""
+        if self.scheduler is not None:
+            self.scheduler.observe(quotes)
+        if self.indicators is not None:
+            self.publish_indicators(quotes)
+        for data in quotes:
+            topic = self.topic_for(data)
+            if self.publish_filter and not self.publish_filter.should_publish(topic, data):
+                self.metrics.count('messages_suppressed')
+                continue
+            # 每个主题的序号连续递增，缓存中的行情不修改，复制后再加追踪字段
+            seq = self.sequences.get(topic, 0) + 1
+            self.sequences[topic] = seq
+            data = dict(data, seq=seq, epoch=self.epoch, t_pub=round(time.time(), 3))
+            # 将数据转换为JSON字符串
+            with self.metrics.timer('serialize'):
+                message = json.dumps(data, ensure_ascii=False)
+            self.send(topic, message)
+            if self.binary:
+                self.publish_binary(topic, data)
+            if not self.splits_topics():
+                print(f"发布消息: {message}")
+
+    def publish_binary(self, topic, data):
+        """在平行主题上发布定长二进制格式，供内存紧张的设备使用"""
+        if data.get('latest_price') is None:
+            return  # 停牌等没有价格的行情，定长格式无法表示，只发布 JSON
+        try:
+            with self.metrics.timer('serialize'):
+                payload = encode_quote(data, data.get('t_pub', time.time()))
+        except (KeyError, ValueError, TypeError, struct.error) as e:
+            # 异常只影响这一条二进制消息，不能中断发布循环
+            print(f"二进制编码失败: {e}")
+            return
+        self.send(topic + BINARY_SUFFIX, payload)
+
+    def publish_stats(self):
+        """到达 stats_interval 时把埋点摘要发布到 <主题>/stats"""
+        if self.stats_interval is None or time.monotonic() - self.last_stats < self.stats_interval:
+            return
+        self.last_stats = time.monotonic()
+        self.client.publish(self.topic + "/stats", json.dumps(self.metrics.snapshot()))
+
+    def next_interval(self, interval):
+        """下一轮抓取前等待的秒数"""
+        if self.scheduler is None:
+            return interval
+        delay = self.scheduler.next_delay()
+        if delay > interval * 6:
+            print(f"休市中，{delay / 60:.0f} 分钟后再抓取")
+        return delay
+
+    def publish_data(self, interval=10):
         """发布数据到MQTT主题"""
         try:
             while True:
-                data = self.get_maotai_futures_data()
-                if data:
-                    # 将数据转换为JSON字符串
-                    message = json.dumps(data, ensure_ascii=False)
-                    self.client.publish(self.topic, message)
-                    print(f"发布消息: {message}")
-                time.sleep(10)  # 每10秒发布一次
+                start = time.time()
+                quotes = self.get_all_quotes()
+                self.publish_quotes(quotes)
+                print(f"本轮获取 {len(quotes)}/{len(self.watchlist)} 只股票，耗时 {time.time() - start:.2f}s")
+                if self.publish_filter:
+                    print(f"发布统计: {self.publish_filter.stats()}")
+                if self.cache:
+                    print(f"缓存统计: {self.cache.stats()}")
+                if isinstance(self.client, ReliablePublisher):
+                    print(f"发布通道统计: {self.client.stats()}")
+                self.publish_stats()
+                time.sleep(self.next_interval(interval))  # 默认每10秒发布一次
         except KeyboardInterrupt:
             print("发布者已断开连接")
-            self.client.disconnect()
+            self.disconnect_mqtt()
+
+    async def _fetch_cycle(self, queue, generation):
+        """一轮抓取：各批次在线程池中并发请求和解析，完成一批就连同轮次编号交给发布任务"""
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self.executor, self.get_quotes_batch, batch)
+                   for batch in self.get_batches()]
+        for future in asyncio.as_completed(futures):
+            await queue.put((generation, await future))
+
+    async def _publish_worker(self, queue):
+        """发布任务：从队列取出解析好的行情并发布"""
+        # secid -> 最近一次发布的轮次；前一轮的慢请求晚于后一轮完成时丢弃，避免旧价格覆盖新价格
+        generations = {}
+        while True:
+            generation, quotes = await queue.get()
+            try:
+                fresh = [quote for quote in quotes if generations.get(quote.get('secid'), -1) <= generation]
+                if len(fresh) < len(quotes):
+                    self.metrics.count('quotes_superseded', len(quotes) - len(fresh))
+                for quote in fresh:
+                    generations[quote.get('secid')] = generation
+                self.publish_quotes(fresh)
+            except Exception as e:
+                print(f"发布失败: {e}")
+            finally:
+                queue.task_done()
+
+    async def publish_data_async(self, interval=10):
+        """异步发布模式：按固定节拍启动抓取，慢请求不会推迟后续节拍"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        worker = asyncio.create_task(self._publish_worker(queue))
+        pending = set()
+        next_tick = loop.time()
+        generation = 0
+        try:
+            while True:
+                # 每个节拍独立创建抓取任务，不等待上一轮完成
+                generation += 1
+                task = asyncio.create_task(self._fetch_cycle(queue, generation))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                self.publish_stats()
+
+                # 以起始时间为基准累加周期，避免 sleep 误差逐轮累积造成漂移
+                step = self.next_interval(interval)
+                next_tick += step
+                delay = next_tick - loop.time()
+                if delay < 0:
+                    # 事件循环被阻塞超过一个周期时跳过错过的节拍
+                    skipped = int(-delay // step) + 1
+                    next_tick += skipped * step
+                    delay = next_tick - loop.time()
+                    print(f"节拍落后，跳过 {skipped} 个周期")
+                await asyncio.sleep(delay)
+        finally:
+            for task in pending:
+                task.cancel()
+            worker.cancel()
 
 if __name__ == "__main__":
-    spider = MaotaiFuturesSpider()  # 修正类名
+    parser = argparse.ArgumentParser(description="茅台行情 MQTT 发布者")
+    parser.add_argument('secids', nargs='*', help="自选股列表，例如 1.600519 0.000858")
+    parser.add_argument('--async', dest='use_async', action='store_true', help="使用 asyncio 发布模式")
+    parser.add_argument('--profile', action='append', default=[], choices=sorted(STOCK_FIELD_PROFILES),
+                        help="额外启用的字段档位，可重复指定")
+    parser.add_argument('--deadband', type=float, default=None,
+                        help="启用变化检测，最新价变动不超过该值（元）时不发布")
+    parser.add_argument('--heartbeat', type=float, default=60, help="变化检测开启时的心跳周期（秒）")
+    parser.add_argument('--binary', action='store_true', help="同时在 <主题>/bin 上发布二进制格式")
+    parser.add_argument('--indicators', action='store_true',
+                        help="在 <主题>/indicators 上发布 SMA/EMA/滚动标准差/VWAP（需要 NumPy）")
+    parser.add_argument('--window', type=int, default=20, help="指标的滚动窗口长度（tick 数）")
+    parser.add_argument('--cache-ttl', type=float, default=None,
+                        help="启用行情缓存，缓存保持新鲜的秒数")
+    parser.add_argument('--stale-ttl', type=float, default=30,
+                        help="缓存过期后仍可先返回旧值的秒数（只用于共享缓存的其他使用方，发布循环总是等待刷新）")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="按交易时段和价格变化自动调整抓取间隔，休市时暂停")
+    parser.add_argument('--holiday', action='append', default=[], help="休市日期 YYYY-MM-DD，可重复指定")
+    parser.add_argument('--reliable', action='store_true', help="断线自动重连，离线期间排队并以 QoS 1 补发")
+    parser.add_argument('--spool', help="发布队列的磁盘文件，进程重启后继续补发（需配合 --reliable）")
+    parser.add_argument('--metrics-port', type=int, default=None, help="在该端口提供 Prometheus 格式的 /metrics")
+    parser.add_argument('--stats-interval', type=float, default=None,
+                        help="每隔该秒数把埋点摘要发布到 <主题>/stats")
+    parser.add_argument('--record', help="把上游原始响应追加录制到该文件，供 replay.py 回放")
+    parser.add_argument('--interval', type=float, default=10, help="发布周期（秒）")
+    parser.add_argument('--broker', default="broker.emqx.io", help="MQTT 代理地址")
+    parser.add_argument('--port', type=int, default=1883, help="MQTT 代理端口")
+    args = parser.parse_args()
+
+    publish_filter = None
+    if args.deadband is not None:
+        publish_filter = PublishFilter(deadband=args.deadband, heartbeat=args.heartbeat)
+    indicators = None
+    profiles = args.profile
+    if args.indicators:
+        if IndicatorEngine is None:
+            parser.error("--indicators 需要安装 NumPy")
+        indicators = IndicatorEngine(window=args.window)
+        # VWAP 需要成交量
+        profiles = profiles + ['volume']
+    cache = None
+    if args.cache_ttl is not None:
+        cache = QuoteCache(ttl=args.cache_ttl, stale_ttl=args.stale_ttl)
+    scheduler = None
+    if args.adaptive:
+        # 交易时段内最短间隔为 --interval 的一半，无变化时最长放慢到 6 倍
+        scheduler = PollScheduler(min_interval=args.interval / 2, max_interval=args.interval * 6,
+                                  holidays=parse_holidays(args.holiday))
+    spider = MaotaiFuturesSpider(watchlist=args.secids or None, profiles=profiles,
+                                 publish_filter=publish_filter, binary=args.binary,
+                                 indicators=indicators, cache=cache, scheduler=scheduler,
+                                 reliable=args.reliable, spool=args.spool,
+                                 stats_interval=args.stats_interval,
+                                 recorder=PayloadLog(args.record) if args.record else None,
+                                 broker=args.broker, port=args.port)
+    if args.metrics_port is not None:
+        serve_metrics(spider.metrics, args.metrics_port)
+        print(f"埋点接口: http://0.0.0.0:{args.metrics_port}/metrics")
     spider.connect_mqtt()  # 连接MQTT
-    spider.publish_data()  # 开始发布数据
\ No newline at end of file
+    if args.use_async:
+        try:
+            asyncio.run(spider.publish_data_async(args.interval))
+        except KeyboardInterrupt:
+            print("发布者已断开连接")
+            spider.disconnect_mqtt()
+    else:
+        spider.publish_data(args.interval)  # 开始发布数据
+    if spider.recorder is not None:
+        spider.recorder.close()
+        print(f"录制统计: {spider.recorder.stats()}")
\ No newline at end of file
@@ -0,0 +1,50 @@
+import threading
+import time
+
+# 由最新价推导出的字段
+DERIVED_FIELDS = ('change_amount', 'change_percent')
+
+class PublishFilter:
+    """发布前的变化检测：价格未变化或变动小于死区时不发布，定期发送心跳"""
+
+    def __init__(self, deadband=0.0, heartbeat=60, fields=('latest_price', 'change_amount', 'change_percent')):
+        self.deadband = deadband  # 最新价变动小于该值（元）视为未变化
+        self.heartbeat = heartbeat  # 超过该秒数未发布则强制发送一次
+        self.fields = fields  # 参与比较的字段，update_time 等每次都变的字段不参与
+        self.last = {}  # 每只股票最近一次发布的 (时间, 字段值)
+        self.sent = 0
+        self.suppressed = 0
+        self.heartbeats = 0
+        self.lock = threading.Lock()  # 异步模式下可能在多个线程中调用
+
+    def changed(self, previous, data):
+        """判断相对上次发布是否有值得发送的变化"""
+        fields = self.fields
+        old, new = previous.get('latest_price'), data.get('latest_price')
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+            if abs(new - old) > self.deadband:
+                return True
+            # 涨跌额、涨跌幅由最新价推导，价格在死区内时不再单独比较
+            fields = [f for f in fields if f not in DERIVED_FIELDS and f != 'latest_price']
+        return any(previous.get(f) != data.get(f) for f in fields)
+
+    def should_publish(self, key, data, now=None):
+        """决定这条消息是否发布，发布时记录为该股票的最新状态"""
+        now = time.time() if now is None else now
+        with self.lock:
+            record = self.last.get(key)
+            if record is not None:
+                last_time, previous = record
+                if not self.changed(previous, data):
+                    if now - last_time < self.heartbeat:
+                        self.suppressed += 1
+                        return False
+                    self.heartbeats += 1
+            self.last[key] = (now, {field: data.get(field) for field in self.fields})
+            self.sent += 1
+            return True
+
+    def stats(self):
+        """返回发送与抑制的计数"""
+        with self.lock:
+            return {'sent': self.sent, 'suppressed': self.suppressed, 'heartbeats': self.heartbeats}
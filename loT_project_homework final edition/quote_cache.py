@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import Future
+
+# 行情缓存：多个使用方（MQTT 发布循环、价格接口、临时脚本）共享同一份上游结果
+# 键为 (secid, 请求字段)，在 ttl 内直接命中；过期但未超过 stale_ttl 时先返回旧值，
+# 同时在后台线程刷新一次；同一个键同时只有一个上游请求，其余调用等待它的结果
+# 按周期发布的使用方不能接受旧值（否则每轮发布的都是上一轮的数据），以 stale=False 调用，过期即阻塞刷新
+
+class QuoteCache:
+    def __init__(self, ttl=5, stale_ttl=30):
+        self.ttl = ttl  # 数据保持新鲜的秒数
+        self.stale_ttl = stale_ttl  # 过期后仍可先返回旧值的秒数
+        self.entries = {}  # 键 -> (获取时间, 值)
+        self.inflight = {}  # 键 -> 正在进行的上游请求的 Future
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0  # 返回旧值并触发后台刷新
+        self.misses = 0
+        self.collapsed = 0  # 等待其他调用已发出的请求，没有再请求上游
+        self.fetches = 0  # 实际发出的上游请求次数
+        self.errors = 0
+
+    def get(self, key, fetch, stale=True):
+        """获取单个键，fetch() 返回该键的值，失败时返回 None"""
+        return self.get_many([key], lambda keys: {key: fetch()}, stale)[0]
+
+    def get_many(self, keys, fetch, stale=True):
+        """获取多个键，未命中的键合并为一次 fetch(键列表) 调用，fetch 返回 {键: 值}；
+        stale 为 False 时过期的键与未命中相同，等待上游返回"""
+        now = time.monotonic()
+        results = {}
+        load, refresh, waits = [], [], {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                age = now - entry[0] if entry else None
+                if entry and age < self.ttl:
+                    self.hits += 1
+                    results[key] = entry[1]
+                elif stale and entry and age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    results[key] = entry[1]
+                    if key not in self.inflight:
+                        self.inflight[key] = Future()
+                        refresh.append(key)
+                elif key in self.inflight:
+                    self.collapsed += 1
+                    waits[key] = self.inflight[key]
+                else:
+                    self.misses += 1
+                    self.inflight[key] = Future()
+                    load.append(key)
+        if refresh:
+            threading.Thread(target=self.load, args=(refresh, fetch), daemon=True).start()
+        if load:
+            results.update(self.load(load, fetch))
+        for key, future in waits.items():
+            results[key] = future.result()
+        return [results.get(key) for key in keys]
+
+    def load(self, keys, fetch):
+        """请求上游并写入缓存，唤醒等待这些键的调用；失败时保留原有的旧值"""
+        try:
+            values = fetch(keys) or {}
+        except Exception as e:
+            print(f"刷新缓存失败: {e}")
+            values = {}
+        now = time.monotonic()
+        with self.lock:
+            self.fetches += 1
+            futures = []
+            for key in keys:
+                value = values.get(key)
+                if value is None:
+                    self.errors += 1
+                else:
+                    self.entries[key] = (now, value)
+                futures.append((self.inflight.pop(key), value))
+        for future, value in futures:
+            future.set_result(value)
+        return {key: values.get(key) for key in keys}
+
+    def stats(self):
+        """命中与未命中统计"""
+        with self.lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.collapsed
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'collapsed': self.collapsed,
+                'fetches': self.fetches,
+                'errors': self.errors,
+                'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,130 @@
+import argparse
+import json
+import time
+from datetime import datetime
+
+from payload_log import SOURCE_LIST, SOURCE_STOCK, read_log
+from publish import MaotaiFuturesSpider
+from sinks import TimeSeriesSink
+
+# 回放 publish.py --record 录制的上游原始响应：经过与实时抓取相同的解析和发布流程
+# 可以按录制时的节奏（1x）、加速（Nx）或不等待（max）回放；
+# max 速度下即为解析/发布的吞吐基准，配合 --tsdb 可把录制的历史行情补写进时间序列存储
+# 行情保留录制时的接收时间 t_recv，补写的 K 线落在原来的时间上
+
+STOCK_SECID = '1.600519'  # 单只股票接口固定请求贵州茅台
+
+def parse_speed(value):
+    if value == 'max':
+        return 0
+    speed = float(value.rstrip('x'))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("速度必须大于 0，或者为 max")
+    return speed
+
+def parse_time(value):
+    """YYYY-MM-DD HH:MM:SS（本地时间）或 Unix 秒"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def parse_record(spider, source, received, payload):
+    """把一条录制的响应解析为行情列表"""
+    if source == SOURCE_LIST:
+        quotes = spider.parse_list_response(payload, received)
+    elif source == SOURCE_STOCK:
+        quote = spider.parse_stock_response(payload, received)
+        if quote is None:
+            return []
+        quote['secid'] = STOCK_SECID
+        quote['code'] = STOCK_SECID.split('.')[1]
+        quotes = [quote]
+    else:
+        raise ValueError(f"未知的来源接口: {source}")
+    return quotes
+
+def replay(spider, path, speed=1.0, publish=False, sink=None, since=None, until=None, show=False):
+    """回放录制文件，speed 为 0 时不等待；返回回放统计"""
+    # 主题取决于自选股数量，回放时按录制中出现过的股票还原
+    spider.watchlist = []
+    seen = set()
+    records = quotes_count = skipped = 0
+    first = last = None
+    start = time.perf_counter()
+    for source, received, payload in read_log(path):
+        if (since is not None and received < since) or (until is not None and received >= until):
+            skipped += 1
+            continue
+        if first is None:
+            first = received
+            start = time.perf_counter()
+        elif speed:
+            # 与录制时第一条记录的间隔按速度缩放，以起点为基准避免误差累积
+            delay = (received - first) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        last = received
+        try:
+            quotes = parse_record(spider, source, received, payload)
+        except ValueError as e:
+            print(f"无法解析 {datetime.fromtimestamp(received)} 的记录: {e}")
+            spider.metrics.error('replay', type(e).__name__)
+            continue
+        for quote in quotes:
+            if quote['secid'] not in seen:
+                seen.add(quote['secid'])
+                spider.watchlist.append(quote['secid'])
+        records += 1
+        quotes_count += len(quotes)
+        if show:
+            for quote in quotes:
+                print(json.dumps(quote, ensure_ascii=False))
+        if publish:
+            spider.publish_quotes(quotes)
+        if sink is not None:
+            sink.write([{'topic': spider.topic_for(quote), 'received_at': received, 'data': quote}
+                        for quote in quotes])
+    elapsed = time.perf_counter() - start
+    return {
+        'records': records,
+        'quotes': quotes_count,
+        'skipped': skipped,
+        'recorded_seconds': round(last - first, 3) if first is not None else 0,
+        'elapsed_seconds': round(elapsed, 3),
+        'records_per_s': round(records / elapsed, 1) if elapsed else None,
+        'quotes_per_s': round(quotes_count / elapsed, 1) if elapsed else None,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放录制的上游行情响应")
+    parser.add_argument('log', help="publish.py --record 录制的文件")
+    parser.add_argument('--speed', type=parse_speed, default=1.0,
+                        help="回放速度：1 为录制时的节奏，10 为 10 倍速，max 为不等待")
+    parser.add_argument('--publish', action='store_true', help="发布到 MQTT，与实时发布者相同的主题和格式")
+    parser.add_argument('--broker', default='127.0.0.1', help="发布用的 MQTT 代理，默认本地代理")
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--binary', action='store_true', help="同时在 <主题>/bin 上发布二进制格式")
+    parser.add_argument('--tsdb', help="把回放的行情补写进时间序列存储（目录）")
+    parser.add_argument('--since', type=parse_time, help="只回放该时间之后的记录")
+    parser.add_argument('--until', type=parse_time, help="只回放该时间之前的记录")
+    parser.add_argument('--print', dest='show', action='store_true', help="打印解析出的每条行情")
+    args = parser.parse_args()
+
+    spider = MaotaiFuturesSpider(binary=args.binary, broker=args.broker, port=args.port)
+    if args.publish:
+        spider.connect_mqtt()
+    sink = TimeSeriesSink(args.tsdb) if args.tsdb else None
+    try:
+        stats = replay(spider, args.log, args.speed, args.publish, sink, args.since, args.until, args.show)
+    except KeyboardInterrupt:
+        stats = None
+        print("回放已中断")
+    finally:
+        if sink is not None:
+            sink.close()
+        if args.publish:
+            spider.disconnect_mqtt()
+    if stats is not None:
+        print(f"回放统计: {stats}")
+    print(f"各阶段耗时: {json.dumps(spider.metrics.snapshot()['stages'], ensure_ascii=False)}")
@@ -0,0 +1,83 @@
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+# 按沪深交易时段调整抓取间隔：连续竞价时段快速轮询，午间休市放慢，收盘后一直等到下一个交易日开盘
+# 交易时段内再根据价格是否变化自适应：有变化立即回到最短间隔，无变化逐步放慢
+
+CST = timezone(timedelta(hours=8))  # 上海时间，无夏令时
+SESSIONS = ((time(9, 30), time(11, 30)), (time(13, 0), time(15, 0)))  # 连续竞价时段
+
+def is_trading_day(day, holidays=()):
+    return day.weekday() < 5 and day not in holidays
+
+def session_state(now, holidays=()):
+    """返回 'trading'（连续竞价）、'break'（开盘前和午间休市）或 'closed'（收盘后、周末和节假日）"""
+    if not is_trading_day(now.date(), holidays):
+        return 'closed'
+    clock = now.timetz().replace(tzinfo=None)
+    for start, end in SESSIONS:
+        if start <= clock < end:
+            return 'trading'
+    if clock >= SESSIONS[-1][1]:
+        return 'closed'
+    return 'break'
+
+def next_boundary(now, holidays=()):
+    """下一个开盘或收盘时刻"""
+    day = now.date()
+    for _ in range(30):  # 最长的节假日也不会超过 30 天
+        if is_trading_day(day, holidays):
+            for start, end in SESSIONS:
+                for moment in (start, end):
+                    boundary = datetime.combine(day, moment, CST)
+                    if boundary > now:
+                        return boundary
+        day += timedelta(days=1)
+    raise ValueError("30 天内没有交易日，请检查节假日设置")
+
+class PollScheduler:
+    def __init__(self, min_interval=3, max_interval=60, break_interval=300, backoff=1.5,
+                 margin=5, holidays=()):
+        self.min_interval = min_interval  # 价格变化时的抓取间隔（秒）
+        self.max_interval = max_interval  # 交易时段内价格长时间不变时的最长间隔
+        self.break_interval = break_interval  # 开盘前和午间休市的间隔
+        self.backoff = backoff  # 一轮无变化后间隔乘以该系数
+        self.margin = margin  # 开盘、收盘后延迟的秒数，确保取到收盘价
+        self.holidays = set(holidays)
+        self.interval = min_interval
+        self.last_prices = {}
+        self.changed = False
+        self.lock = threading.Lock()  # 异步模式下 observe 在发布任务中调用
+
+    def observe(self, quotes):
+        """记录一批行情，与上一轮相比有价格变化时标记为活跃"""
+        with self.lock:
+            for quote in quotes:
+                key = quote.get('secid') or quote.get('code') or quote.get('name')
+                price = quote.get('latest_price')
+                if key in self.last_prices and self.last_prices[key] != price:
+                    self.changed = True
+                self.last_prices[key] = price
+
+    def next_delay(self, now=None):
+        """返回距离下一次抓取的秒数，不会越过开盘、收盘时刻"""
+        now = datetime.now(CST) if now is None else now.astimezone(CST)
+        state = session_state(now, self.holidays)
+        with self.lock:
+            if state == 'trading':
+                if self.changed:
+                    self.interval = self.min_interval
+                else:
+                    self.interval = min(self.interval * self.backoff, self.max_interval)
+                delay = self.interval
+            else:
+                # 休市期间的间隔不参与自适应，开盘时从最短间隔开始
+                self.interval = self.min_interval
+                delay = self.break_interval if state == 'break' else None
+            self.changed = False
+        until = (next_boundary(now, self.holidays) - now).total_seconds() + self.margin
+        return until if delay is None else min(delay, until)
+
+def parse_holidays(values):
+    """把 YYYY-MM-DD 字符串列表转换为日期集合"""
+    return {date.fromisoformat(value) for value in values}
@@ -0,0 +1,273 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+from bisect import bisect, insort
+from collections import deque
+
+from publish import MaotaiFuturesSpider
+
+# 多进程分片抓取：自选股按一致性哈希分配到 N 个工作进程，每个进程有独立的 requests.Session 和 MQTT 客户端，
+# JSON 解析不再受单个进程 GIL 的限制；监督进程重启退出或卡住的分片，
+# 某个分片反复崩溃时把它从哈希环上摘除，只有该分片的股票会迁移到其他分片
+
+REPLICAS = 100  # 每个分片在哈希环上的虚拟节点数，越多分配越均匀
+
+# 分片状态数组（监督进程与工作进程共享）的下标
+HEARTBEAT = 0  # 最近一轮完成的时间（time.time()）
+QUOTES = 1  # 累计抓取的行情数
+MESSAGES = 2  # 累计发布的消息数
+
+def _hash(key):
+    # 内置 hash() 在不同进程中的结果不同，这里用 md5 保证分配稳定
+    return int.from_bytes(hashlib.md5(str(key).encode('utf-8')).digest()[:8], 'big')
+
+class HashRing:
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        self.replicas = replicas
+        self.points = []  # 排好序的虚拟节点哈希值
+        self.owners = {}  # 虚拟节点哈希值 -> 分片
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            self.owners[point] = node
+            insort(self.points, point)
+
+    def remove(self, node):
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            if self.owners.pop(point, None) is not None:
+                self.points.remove(point)
+
+    def node_for(self, key):
+        """顺时针方向遇到的第一个虚拟节点所属的分片"""
+        if not self.points:
+            raise ValueError("哈希环上没有分片")
+        index = bisect(self.points, _hash(key)) % len(self.points)
+        return self.owners[self.points[index]]
+
+    def partition(self, keys):
+        """把 keys 按分片分组，保持原顺序；没有分到股票的分片对应空列表"""
+        groups = {node: [] for node in self.nodes}
+        for key in keys:
+            groups[self.node_for(key)].append(key)
+        return groups
+
+def run_shard(shard, secids, options, updates, status, stop):
+    """工作进程：与单进程发布者相同的抓取、解析和发布流程，只负责分到的股票"""
+    # 分片只有部分股票，主题按整体自选股数量决定，与单进程运行时一致
+    mqtt_options = {key: options[key] for key in ('broker', 'port') if options.get(key)}
+    spider = MaotaiFuturesSpider(watchlist=secids, batch_size=options['batch_size'],
+                                 max_workers=options['max_workers'], binary=options['binary'],
+                                 split_topics=options['split_topics'], **mqtt_options)
+    if options.get('list_api_url'):
+        spider.list_api_url = options['list_api_url']
+    spider.connect_mqtt()
+    interval = options['interval']
+    next_run = time.monotonic()
+    try:
+        while not stop.is_set():
+            # 再平衡后监督进程发来新的股票列表，只取最新的一份
+            try:
+                while True:
+                    spider.watchlist = updates.get_nowait()
+            except queue.Empty:
+                pass
+            status[HEARTBEAT] = time.time()
+            if not spider.watchlist:
+                stop.wait(1)  # 股票比分片少时可能分不到股票，等待再平衡
+                continue
+            quotes = spider.get_all_quotes()
+            published = spider.metrics.counters.get('messages_published', 0)
+            spider.publish_quotes(quotes)
+            status[QUOTES] += len(quotes)
+            status[MESSAGES] += spider.metrics.counters.get('messages_published', 0) - published
+            status[HEARTBEAT] = time.time()
+            next_run += interval
+            delay = next_run - time.monotonic()
+            if delay < 0:
+                next_run = time.monotonic()  # 跟不上时不补跑错过的轮次
+            elif delay:
+                stop.wait(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        spider.disconnect_mqtt()
+
+class Shard:
+    """监督进程中记录的一个分片"""
+
+    def __init__(self, shard_id, secids):
+        self.id = shard_id
+        self.secids = secids
+        self.process = None
+        self.updates = None
+        self.stop = None
+        self.status = multiprocessing.Array('d', 3, lock=False)  # 只有当前的工作进程写入
+        self.restarts = deque()  # 最近的重启时间
+
+class ShardSupervisor:
+    def __init__(self, watchlist, shards, options, max_restarts=5, restart_window=60, stall_timeout=120):
+        self.watchlist = list(dict.fromkeys(watchlist))  # 去重并保持顺序
+        self.options = dict(options, split_topics=len(self.watchlist) > 1)
+        self.max_restarts = max_restarts  # restart_window 秒内重启超过该次数即放弃该分片并再平衡
+        self.restart_window = restart_window
+        self.stall_timeout = stall_timeout  # 超过该秒数没有完成一轮即认为卡住
+        self.ring = HashRing(range(shards))
+        self.shards = {shard_id: Shard(shard_id, secids)
+                       for shard_id, secids in self.ring.partition(self.watchlist).items()}
+        self.failed = []
+        self.retired = {'quotes': 0, 'messages': 0, 'restarts': 0}  # 已摘除分片的累计值，保证总数单调递增
+
+    def start(self):
+        for shard in self.shards.values():
+            self.spawn(shard)
+
+    def spawn(self, shard):
+        # 被杀死的进程可能正持有队列或事件内部的锁，每次启动都换新的，不与旧进程共用
+        shard.updates = multiprocessing.Queue()
+        shard.stop = multiprocessing.Event()
+        shard.status[HEARTBEAT] = time.time()
+        shard.process = multiprocessing.Process(
+            target=run_shard, name=f"shard-{shard.id}", daemon=True,
+            args=(shard.id, shard.secids, self.options, shard.updates, shard.status, shard.stop))
+        shard.process.start()
+
+    def check(self):
+        """一次巡检：重启退出或卡住的分片，反复失败的分片摘除后再平衡"""
+        now = time.time()
+        for shard in list(self.shards.values()):
+            if shard.process.is_alive():
+                if now - shard.status[HEARTBEAT] < self.stall_timeout:
+                    continue
+                print(f"分片 {shard.id} 超过 {self.stall_timeout} 秒没有完成一轮，强制重启")
+                shard.process.terminate()
+                shard.process.join()
+            else:
+                print(f"分片 {shard.id} 已退出，退出码 {shard.process.exitcode}")
+            while shard.restarts and now - shard.restarts[0] > self.restart_window:
+                shard.restarts.popleft()
+            if len(shard.restarts) >= self.max_restarts:
+                self.remove(shard)
+                continue
+            shard.restarts.append(now)
+            self.spawn(shard)
+
+    def remove(self, shard):
+        """摘除分片，把它的股票分给其余分片"""
+        del self.shards[shard.id]
+        self.failed.append(shard.id)
+        self.retired['quotes'] += int(shard.status[QUOTES])
+        self.retired['messages'] += int(shard.status[MESSAGES])
+        self.retired['restarts'] += len(shard.restarts)
+        self.ring.remove(shard.id)
+        if not self.shards:
+            raise RuntimeError("所有分片都已失败")
+        print(f"分片 {shard.id} 在 {self.restart_window} 秒内重启超过 {self.max_restarts} 次，"
+              f"{len(shard.secids)} 只股票迁移到其他分片")
+        self.rebalance()
+
+    def rebalance(self):
+        """按当前哈希环重新分组，只通知股票有变化的分片"""
+        for shard_id, secids in self.ring.partition(self.watchlist).items():
+            shard = self.shards[shard_id]
+            if secids != shard.secids:
+                shard.secids = secids
+                shard.updates.put(secids)
+
+    def run(self, duration=None, check_interval=1, report_interval=None):
+        """巡检直到 duration 秒后或被中断"""
+        start = last_report = time.monotonic()
+        last = self.stats()
+        while duration is None or time.monotonic() - start < duration:
+            time.sleep(check_interval)
+            self.check()
+            if report_interval and time.monotonic() - last_report >= report_interval:
+                stats = self.stats()
+                elapsed = time.monotonic() - last_report
+                print(f"{len(self.shards)} 个分片，"
+                      f"{(stats['quotes'] - last['quotes']) / elapsed:.0f} 条行情/秒，"
+                      f"{(stats['messages'] - last['messages']) / elapsed:.0f} 条消息/秒，"
+                      f"重启 {stats['restarts']} 次")
+                last, last_report = stats, time.monotonic()
+
+    def stop(self, timeout=10):
+        for shard in self.shards.values():
+            shard.stop.set()
+        for shard in self.shards.values():
+            shard.process.join(timeout)
+            if shard.process.is_alive():
+                shard.process.terminate()
+
+    def stats(self):
+        shards = {
+            shard.id: {
+                'symbols': len(shard.secids),
+                'alive': shard.process is not None and shard.process.is_alive(),
+                'restarts': len(shard.restarts),
+                'quotes': int(shard.status[QUOTES]),
+                'messages': int(shard.status[MESSAGES]),
+            }
+            for shard in self.shards.values()
+        }
+        return {
+            'shards': shards,
+            'failed': list(self.failed),
+            'quotes': self.retired['quotes'] + sum(s['quotes'] for s in shards.values()),
+            'messages': self.retired['messages'] + sum(s['messages'] for s in shards.values()),
+            'restarts': self.retired['restarts'] + sum(s['restarts'] for s in shards.values()),
+        }
+
+def load_watchlist(path):
+    """每行一个 secid，# 开头为注释"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多进程分片的行情发布者")
+    parser.add_argument('secids', nargs='*', help="自选股列表，例如 1.600519 0.000858")
+    parser.add_argument('--watchlist', help="自选股文件，每行一个 secid")
+    parser.add_argument('--shards', type=int, default=os.cpu_count(), help="工作进程数，默认为 CPU 核数")
+    parser.add_argument('--interval', type=float, default=10, help="每个分片的抓取周期（秒）")
+    parser.add_argument('--batch-size', type=int, default=100, help="每个批量请求包含的股票数")
+    parser.add_argument('--workers', type=int, default=4, help="每个分片同时进行的批量请求数")
+    parser.add_argument('--binary', action='store_true', help="同时在 <主题>/bin 上发布二进制格式")
+    parser.add_argument('--broker', help="MQTT 代理地址，默认与 publish.py 相同")
+    parser.add_argument('--port', type=int, help="MQTT 代理端口")
+    parser.add_argument('--max-restarts', type=int, default=5, help="窗口内允许的重启次数，超过后摘除分片")
+    parser.add_argument('--restart-window', type=float, default=60, help="统计重启次数的窗口（秒）")
+    parser.add_argument('--stall-timeout', type=float, default=120, help="分片卡住多少秒后强制重启")
+    parser.add_argument('--report-interval', type=float, default=10, help="打印吞吐的间隔（秒）")
+    args = parser.parse_args()
+
+    watchlist = args.secids + (load_watchlist(args.watchlist) if args.watchlist else [])
+    if not watchlist:
+        parser.error("请指定自选股或 --watchlist 文件")
+    options = {
+        'interval': args.interval,
+        'batch_size': args.batch_size,
+        'max_workers': args.workers,
+        'binary': args.binary,
+        'broker': args.broker,
+        'port': args.port,
+    }
+    supervisor = ShardSupervisor(watchlist, args.shards, options, args.max_restarts,
+                                 args.restart_window, args.stall_timeout)
+    for shard_id, shard in sorted(supervisor.shards.items()):
+        print(f"分片 {shard_id}: {len(shard.secids)} 只股票")
+    supervisor.start()
+    try:
+        supervisor.run(report_interval=args.report_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+        print(f"分片统计: {supervisor.stats()}")
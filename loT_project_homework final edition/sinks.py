@@ -0,0 +1,151 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from tsdb import TimeSeriesStore
+from wire_format import BINARY_SUFFIX
+
+# 订阅者的输出端：每个 sink 一次接收一批已解码的记录
+# 记录格式: {'topic': 主题, 'received_at': 接收时间戳, 'data': 解码后的字典}
+
+class Sink:
+    """输出端基类，write 在多个工作线程中调用，由锁保证串行"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def write(self, records):
+        with self.lock:
+            self.write_batch(records)
+
+    def write_batch(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class StdoutSink(Sink):
+    """打印到控制台，一批记录合并为一次输出"""
+
+    def write_batch(self, records):
+        lines = []
+        for record in records:
+            data = record['data']
+            if 'current_price' not in data and 'latest_price' not in data:
+                continue  # 指标、统计等非行情消息不打印
+            price = data.get('current_price', data.get('latest_price'))
+            timestamp = data.get('timestamp', record['received_at'])
+            lines.append(f"[{record['topic']}] 更新时间: {time.ctime(timestamp)} "
+                         f"当前价格: {price} 未来价格: {data.get('future_price', 'N/A')}")
+        if lines:
+            print('\n'.join(lines))
+
+class FileSink(Sink):
+    """追加写入 JSON Lines 文件，每批刷新一次"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write_batch(self, records):
+        self.file.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class SQLiteSink(Sink):
+    """写入 SQLite，每批一个事务"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS quotes (topic TEXT, received_at REAL, payload TEXT)")
+
+    def write_batch(self, records):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO quotes VALUES (?, ?, ?)",
+                [(r['topic'], r['received_at'], json.dumps(r['data'], ensure_ascii=False)) for r in records])
+
+    def close(self):
+        self.conn.close()
+
+class TimeSeriesSink(Sink):
+    """写入本地时间序列存储，按股票分别保存逐笔价格并自动生成 K 线
+    订阅者有多个工作线程，批次到达的先后不一定是行情的先后，而存储会丢弃时间倒退的数据，
+    所以逐笔数据先缓冲 delay 秒，再按时间排序写入"""
+
+    def __init__(self, root, delay=2.0, dedupe=1000):
+        super().__init__()
+        self.store = TimeSeriesStore(root)
+        self.delay = delay
+        self.pending = []  # (写入时刻, 行情时间, 股票, 价格)
+        self.dedupe = dedupe  # 每只股票记住的最近序号数
+        self.seen = {}  # 股票 -> (发布者 epoch, 最近序号的队列, 集合)
+        self.duplicates = 0
+
+    def is_duplicate(self, symbol, seq, epoch=None):
+        """QoS 1 补发可能重复送达，按 (股票, 序号) 去重；发布者重启后序号重新开始，epoch 变化时清空"""
+        entry = self.seen.get(symbol)
+        if entry is None or entry[0] != epoch:
+            entry = self.seen[symbol] = (epoch, deque(), set())
+        _, order, seqs = entry
+        if seq in seqs:
+            self.duplicates += 1
+            return True
+        order.append(seq)
+        seqs.add(seq)
+        if len(order) > self.dedupe:
+            seqs.discard(order.popleft())
+        return False
+
+    def write_batch(self, records):
+        now = time.monotonic()
+        ticks = []  # 整批检查通过后再放入缓冲，出错时不留下半批，逐条重试不会重复写入
+        for record in records:
+            topic = record['topic']
+            if topic.endswith(BINARY_SUFFIX):
+                continue  # 二进制消息是同一行情在平行主题上的副本，只保存 JSON 主题的
+            data = record['data']
+            price = data.get('latest_price', data.get('current_price'))
+            if not isinstance(price, (int, float)):
+                continue
+            # 多只股票的消息带有 secid；单只股票的旧格式没有，用主题区分
+            symbol = data.get('secid') or topic
+            if data.get('seq') is not None and self.is_duplicate(symbol, data['seq'], data.get('epoch')):
+                continue
+            # 优先使用发布者收到上游数据的时间
+            ts = data.get('t_recv', data.get('timestamp', record['received_at']))
+            ticks.append((now, ts, symbol, price))
+        self.pending.extend(ticks)
+        self.flush_pending(now - self.delay)
+
+    def flush_pending(self, before=None):
+        """把 before 之前缓冲的逐笔数据按时间排序写入，before 为 None 时全部写入"""
+        if before is None:
+            ready, self.pending = self.pending, []
+        else:
+            ready = [tick for tick in self.pending if tick[0] <= before]
+            if not ready:
+                return
+            self.pending = [tick for tick in self.pending if tick[0] > before]
+        ready.sort(key=lambda tick: tick[1])
+        for _, ts, symbol, price in ready:
+            self.store.append(symbol, ts, price)
+
+    def close(self):
+        with self.lock:
+            self.flush_pending()
+        self.store.close()
+
+class CallbackSink(Sink):
+    """把每批记录交给自定义函数处理"""
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def write_batch(self, records):
+        self.callback(records)
@@ -22,21 +22,37 @@ SET_PRECHARGE       = const(0xd9)
 SET_VCOM_DESEL      = const(0xdb)
 SET_CHARGE_PUMP     = const(0x8d)
 
+# maximum number of command bytes sent in one batched transaction
+CMD_BATCH = const(32)
+
 
 class SSD1306:
-    def __init__(self, width, height, external_vcc):
+    def __init__(self, width, height, external_vcc, double_buffer=False):
         self.width = width
         self.height = height
         self.external_vcc = external_vcc
         self.pages = self.height // 8
-        # Note the subclass must initialize self.framebuf to a framebuffer.
+        # With double_buffer, keep a copy of the last transmitted frame so
+        # show() sends only the bytes that differ from what the panel shows.
+        # The shadow is one plain bytearray, i.e. one extra frame of RAM.
+        self.shadow = bytearray(self.pages * width) if double_buffer else None
+        self.shadow_valid = False
+        # Dirty window [x0, x1, page0, page1] grown by the drawing methods and
+        # sent by show().  It is preallocated so tracking doesn't allocate.
+        self.dirty = False
+        self.dirty_rect = [0, 0, 0, 0]
+        # scratch space for the short command sequences built by show(),
+        # contrast() and invert()
+        self.cmd_scratch = bytearray(6)
+        # Note the subclass must initialize self.framebuf to a framebuffer
+        # and self.data to a memoryview of the pixel bytes it draws into.
         # This is necessary because the underlying data buffer is different
         # between I2C and SPI implementations (I2C needs an extra byte).
         self.poweron()
         self.init_display()
 
     def init_display(self):
-        for cmd in (
+        cmds = (
             SET_DISP | 0x00, # off
             # address setting
             SET_MEM_ADDR, 0x00, # horizontal
@@ -57,8 +73,8 @@ class SSD1306:
             SET_NORM_INV, # not inverted
             # charge pump
             SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
-            SET_DISP | 0x01): # on
-            self.write_cmd(cmd)
+            SET_DISP | 0x01) # on
+        self.write_cmds(cmds, len(cmds))
         self.fill(0)
         self.show()
 
@@ -66,45 +82,149 @@ class SSD1306:
         self.write_cmd(SET_DISP | 0x00)
 
     def contrast(self, contrast):
-        self.write_cmd(SET_CONTRAST)
-        self.write_cmd(contrast)
+        cmds = self.cmd_scratch
+        cmds[0] = SET_CONTRAST
+        cmds[1] = contrast
+        self.write_cmds(cmds, 2)
 
     def invert(self, invert):
-        self.write_cmd(SET_NORM_INV | (invert & 1))
+        cmds = self.cmd_scratch
+        cmds[0] = SET_NORM_INV | (invert & 1)
+        self.write_cmds(cmds, 1)
+
+    def write_cmds(self, cmds, n):
+        # Send the first n bytes of cmds as commands.  Interfaces that can
+        # batch several commands into one transaction override this.
+        for i in range(n):
+            self.write_cmd(cmds[i])
+
+    def show(self, full=False):
+        # Send only the window touched by text/pixel/fill/scroll since the
+        # last show().  If nothing was tracked (e.g. the framebuf was drawn
+        # on directly) or full is set, fall back to sending the whole frame.
+        shadow = self.shadow
+        if full or not self.dirty or (shadow is not None and not self.shadow_valid):
+            self.write_window(0, self.width - 1, 0, self.pages - 1)
+            if shadow is not None:
+                shadow[:] = self.data
+                self.shadow_valid = True
+        else:
+            rect = self.dirty_rect
+            if shadow is None:
+                self.write_window(rect[0], rect[1], rect[2], rect[3])
+            else:
+                self.write_diff(rect[0], rect[1], rect[2], rect[3])
+        self.dirty = False
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
+    def write_diff(self, x0, x1, p0, p1):
+        # Compare the window against the shadow page by page and send only
+        # the column span that changed in each page.
+        data = self.data
+        shadow = self.shadow
+        width = self.width
+        for page in range(p0, p1 + 1):
+            start = page * width
+            lo = start + x0
+            hi = start + x1
+            while lo <= hi and data[lo] == shadow[lo]:
+                lo += 1
+            if lo > hi:
+                continue
+            while data[hi] == shadow[hi]:
+                hi -= 1
+            self.write_window(lo - start, hi - start, page, page)
+            shadow[lo:hi + 1] = data[lo:hi + 1]
+
+    def write_window(self, x0, x1, p0, p1):
+        offset = 0
         if self.width == 64:
             # displays with width of 64 pixels are shifted by 32
-            x0 += 32
-            x1 += 32
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_framebuf()
+            offset = 32
+        cmds = self.cmd_scratch
+        cmds[0] = SET_COL_ADDR
+        cmds[1] = x0 + offset
+        cmds[2] = x1 + offset
+        cmds[3] = SET_PAGE_ADDR
+        cmds[4] = p0
+        cmds[5] = p1
+        self.write_cmds(cmds, 6)
+        width = self.width
+        if x0 == 0 and x1 == width - 1:
+            if p0 == 0 and p1 == self.pages - 1:
+                self.write_framebuf()
+            else:
+                # full-width pages are contiguous in the buffer
+                self.write_data(self.data[p0 * width:(p1 + 1) * width])
+        else:
+            # the controller wraps to the next page inside the column window,
+            # so the page slices can be sent back to back
+            for page in range(p0, p1 + 1):
+                start = page * width
+                self.write_data(self.data[start + x0:start + x1 + 1])
+
+    def mark_dirty(self, x0, y0, x1, y1):
+        # Grow the dirty window to cover the inclusive pixel rectangle,
+        # clipped to the display.
+        if x0 < 0:
+            x0 = 0
+        if y0 < 0:
+            y0 = 0
+        if x1 >= self.width:
+            x1 = self.width - 1
+        if y1 >= self.height:
+            y1 = self.height - 1
+        if x0 > x1 or y0 > y1:
+            return
+        rect = self.dirty_rect
+        p0 = y0 >> 3
+        p1 = y1 >> 3
+        if not self.dirty:
+            rect[0] = x0
+            rect[1] = x1
+            rect[2] = p0
+            rect[3] = p1
+            self.dirty = True
+            return
+        if x0 < rect[0]:
+            rect[0] = x0
+        if x1 > rect[1]:
+            rect[1] = x1
+        if p0 < rect[2]:
+            rect[2] = p0
+        if p1 > rect[3]:
+            rect[3] = p1
 
     def fill(self, col):
         self.framebuf.fill(col)
+        self.mark_dirty(0, 0, self.width - 1, self.height - 1)
 
     def pixel(self, x, y, col):
         self.framebuf.pixel(x, y, col)
+        self.mark_dirty(x, y, x, y)
 
     def scroll(self, dx, dy):
         self.framebuf.scroll(dx, dy)
+        self.mark_dirty(0, 0, self.width - 1, self.height - 1)
 
     def text(self, string, x, y, col=1):
         self.framebuf.text(string, x, y, col)
+        # the built-in font is 8x8 pixels per character
+        self.mark_dirty(x, y, x + 8 * len(string) - 1, y + 7)
 
 
 class SSD1306_I2C(SSD1306):
-    def __init__(self, width, height, i2c, addr=0x3c, external_vcc=False):
+    def __init__(self, width, height, i2c, addr=0x3c, external_vcc=False, double_buffer=False):
         self.i2c = i2c
         self.addr = addr
         self.temp = bytearray(2)
+        # Batched commands are sent as a single transaction whose control
+        # byte (Co=0, D/C#=0) marks every following byte as a command.  The
+        # memoryviews of each length are made up front so that sending a
+        # batch doesn't allocate.
+        self.cmd_buf = bytearray(CMD_BATCH + 1)
+        self.cmd_buf[0] = 0x00
+        cmd_view = memoryview(self.cmd_buf)
+        self.cmd_views = [cmd_view[:i + 1] for i in range(CMD_BATCH + 1)]
         # Add an extra byte to the data buffer to hold an I2C data/command byte
         # to use hardware-compatible I2C transactions.  A memoryview of the
         # buffer is used to mask this byte from the framebuffer operations
@@ -112,25 +232,44 @@ class SSD1306_I2C(SSD1306):
         # buffer).
         self.buffer = bytearray(((height // 8) * width) + 1)
         self.buffer[0] = 0x40  # Set first byte of data buffer to Co=0, D/C=1
-        self.framebuf = framebuf.FrameBuffer1(memoryview(self.buffer)[1:], width, height)
-        super().__init__(width, height, external_vcc)
+        self.data = memoryview(self.buffer)[1:]
+        self.data_prefix = memoryview(self.buffer)[:1]
+        self.framebuf = framebuf.FrameBuffer1(self.data, width, height)
+        super().__init__(width, height, external_vcc, double_buffer)
 
     def write_cmd(self, cmd):
         self.temp[0] = 0x80 # Co=1, D/C#=0
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def write_cmds(self, cmds, n):
+        buf = self.cmd_buf
+        start = 0
+        while start < n:
+            count = n - start
+            if count > CMD_BATCH:
+                count = CMD_BATCH
+            for i in range(count):
+                buf[i + 1] = cmds[start + i]
+            self.i2c.writeto(self.addr, self.cmd_views[count])
+            start += count
+
     def write_framebuf(self):
         # Blast out the frame buffer using a single I2C transaction to support
         # hardware I2C interfaces.
         self.i2c.writeto(self.addr, self.buffer)
 
+    def write_data(self, buf):
+        # Partial updates are not prefixed by the data/command byte in the
+        # buffer, so send it together with the slice in one transaction.
+        self.i2c.writevto(self.addr, (self.data_prefix, buf))
+
     def poweron(self):
         pass
 
 
 class SSD1306_SPI(SSD1306):
-    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False):
+    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False, double_buffer=False):
         self.rate = 10 * 1024 * 1024
         dc.init(dc.OUT, value=0)
         res.init(res.OUT, value=0)
@@ -139,24 +278,60 @@ class SSD1306_SPI(SSD1306):
         self.dc = dc
         self.res = res
         self.cs = cs
+        # rate the bus was last configured with; set to None to force a
+        # re-init, e.g. when another device on the same bus changed it
+        self.spi_rate = None
+        # preallocated command buffer and a memoryview of each length, so
+        # sending commands doesn't allocate
+        self.cmd_buf = bytearray(CMD_BATCH)
+        cmd_view = memoryview(self.cmd_buf)
+        self.cmd_views = [cmd_view[:i] for i in range(CMD_BATCH + 1)]
         self.buffer = bytearray((height // 8) * width)
+        self.data = memoryview(self.buffer)
         self.framebuf = framebuf.FrameBuffer1(self.buffer, width, height)
-        super().__init__(width, height, external_vcc)
+        super().__init__(width, height, external_vcc, double_buffer)
+
+    def init_spi(self):
+        # Only reconfigure the bus when the rate has changed.
+        if self.spi_rate != self.rate:
+            self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+            self.spi_rate = self.rate
 
     def write_cmd(self, cmd):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cmd_buf[0] = cmd
+        self.write_cmd_view(self.cmd_views[1])
+
+    def write_cmds(self, cmds, n):
+        # With D/C# held low every byte is a command, so a whole sequence
+        # can be clocked out under one chip select.
+        buf = self.cmd_buf
+        start = 0
+        while start < n:
+            count = n - start
+            if count > CMD_BATCH:
+                count = CMD_BATCH
+            for i in range(count):
+                buf[i] = cmds[start + i]
+            self.write_cmd_view(self.cmd_views[count])
+            start += count
+
+    def write_cmd_view(self, view):
+        self.init_spi()
         self.cs.high()
         self.dc.low()
         self.cs.low()
-        self.spi.write(bytearray([cmd]))
+        self.spi.write(view)
         self.cs.high()
 
     def write_framebuf(self):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.write_data(self.buffer)
+
+    def write_data(self, buf):
+        self.init_spi()
         self.cs.high()
         self.dc.high()
         self.cs.low()
-        self.spi.write(self.buffer)
+        self.spi.write(buf)
         self.cs.high()
 
     def poweron(self):
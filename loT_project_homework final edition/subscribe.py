@@ -1,6 +1,11 @@
 import paho.mqtt.client as mqtt
+import argparse
 import json
+import queue
+import threading
 import time
+from sinks import FileSink, SQLiteSink, StdoutSink, TimeSeriesSink
+from wire_format import BINARY_SUFFIX, decode_quote
 
 # MQTT 配置
 BROKER = "broker.emqx.io"
@@ -12,54 +17,148 @@ def on_connect(client, userdata, flags, rc):
     """连接成功回调"""
     if rc == 0:
         print(f"客户端 {CLIENT_ID} 已连接到 MQTT Broker")
-        client.subscribe(TOPIC)
+        # 同时订阅多只股票的子主题和二进制格式的平行主题
+        client.subscribe(TOPIC + "/#")
     else:
         print(f"连接失败，返回码: {rc}")
 
-def on_message(client, userdata, msg):
-    """消息接收回调"""
-    try:
-        print(f"接收到消息 [{msg.topic}]: {msg.payload.decode()}")
-        
-        # 解析JSON数据
-        json_data = json.loads(msg.payload.decode())
-        
-        # 提取茅台价格信息
-        current_price = json_data.get('current_price', 'N/A')
-        future_price = json_data.get('future_price', 'N/A')
-        timestamp = json_data.get('timestamp', time.time())
-        
-        # 格式化时间戳
-        local_time = time.ctime(timestamp)
-        
-        # 显示价格信息
-        print("\n===== 茅台价格信息 =====")
-        print(f"更新时间: {local_time}")
-        print(f"当前价格: {current_price}")
-        print(f"未来价格: {future_price}")
-        print("=======================\n")
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON解析错误: {e}")
-    except Exception as e:
-        print(f"处理消息时出错: {e}")
+class QueuedSubscriber:
+    """paho 网络线程只负责把消息放进有界队列，解码与输出由工作线程批量完成"""
+
+    def __init__(self, sinks, maxsize=10000, workers=2, batch_size=500, batch_timeout=0.2, drop=False):
+        self.sinks = sinks
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout  # 凑批最多等待的秒数
+        self.drop = drop  # 队列满时丢弃新消息；否则阻塞网络线程，由 TCP 对代理形成背压
+        self.running = True
+        self.lock = threading.Lock()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.blocked = 0  # 队列满导致网络线程等待的次数
+        self.errors = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.threads = [threading.Thread(target=self.worker, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def on_message(self, client, userdata, msg):
+        """消息接收回调，只入队不做任何处理"""
+        self.received += 1
+        item = (msg.topic, msg.payload, time.time())
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            if self.drop:
+                self.dropped += 1
+                return
+            self.blocked += 1
+            self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def decode(self, topic, payload, received_at):
+        if topic.endswith(BINARY_SUFFIX):
+            data = decode_quote(payload)
+        else:
+            data = json.loads(payload)
+            if not isinstance(data, dict):
+                # 公共代理上任何人都能往主题里发消息，合法的 JSON 也可能不是对象
+                raise ValueError(f"消息不是 JSON 对象: {type(data).__name__}")
+        return {'topic': topic, 'received_at': received_at, 'data': data}
+
+    def next_batch(self):
+        """取出一批消息：先阻塞等第一条，再在超时前尽量凑满"""
+        try:
+            batch = [self.queue.get(timeout=self.batch_timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.001)
+        return batch
+
+    def worker(self):
+        while self.running or not self.queue.empty():
+            batch = self.next_batch()
+            if not batch:
+                continue
+            records = []
+            errors = 0
+            for topic, payload, received_at in batch:
+                try:
+                    records.append(self.decode(topic, payload, received_at))
+                except (ValueError, UnicodeDecodeError):
+                    errors += 1
+            for sink in self.sinks:
+                try:
+                    sink.write(records)
+                except Exception as e:
+                    print(f"输出到 {type(sink).__name__} 失败，逐条重试: {e}")
+                    errors += self.write_each(sink, records)
+            with self.lock:
+                self.processed += len(batch)
+                self.errors += errors
+                self.batches += 1
+
+    def write_each(self, sink, records):
+        """整批写入失败时逐条写入，只丢弃出错的记录，返回出错的条数"""
+        failed = 0
+        for record in records:
+            try:
+                sink.write([record])
+            except Exception:
+                failed += 1
+        return failed
+
+    def stats(self):
+        """队列与处理统计，用于观察背压"""
+        return {
+            'received': self.received,
+            'processed': self.processed,
+            'queued': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'errors': self.errors,
+            'batches': self.batches,
+        }
+
+    def stop(self):
+        """处理完队列中剩余的消息后停止"""
+        self.running = False
+        for thread in self.threads:
+            thread.join()
+        for sink in self.sinks:
+            sink.close()
 
 def on_disconnect(client, userdata, rc):
     """断开连接回调"""
     print(f"已断开与MQTT Broker的连接，返回码: {rc}")
     if rc != 0:
+        # loop_forever 会按 reconnect_delay_set 的退避间隔自动重连，重连后 on_connect 重新订阅
         print("意外断开，尝试重新连接...")
-        # 可添加重连逻辑
 
-def subscribe_maotai_price():
+def subscribe_maotai_price(sinks=None, **options):
     """订阅茅台价格数据"""
+    subscriber = QueuedSubscriber(sinks if sinks is not None else [StdoutSink()], **options)
+
     # 创建MQTT客户端实例
     client = mqtt.Client(client_id=CLIENT_ID)
     
     # 设置回调函数
     client.on_connect = on_connect
-    client.on_message = on_message
+    client.on_message = subscriber.on_message
     client.on_disconnect = on_disconnect
+    client.reconnect_delay_set(min_delay=1, max_delay=60)
     
     # 连接到MQTT代理
     try:
@@ -69,13 +168,35 @@ def subscribe_maotai_price():
         # 开始循环处理网络流量
         client.loop_forever()
         
+    except KeyboardInterrupt:
+        client.disconnect()
+        subscriber.stop()
+        print(f"订阅统计: {subscriber.stats()}")
     except Exception as e:
         print(f"连接MQTT代理时出错: {e}")
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="茅台价格订阅器")
+    parser.add_argument('--file', help="同时写入 JSON Lines 文件")
+    parser.add_argument('--sqlite', help="同时写入 SQLite 数据库")
+    parser.add_argument('--tsdb', help="同时写入本地时间序列存储（目录）")
+    parser.add_argument('--quiet', action='store_true', help="不打印到控制台")
+    parser.add_argument('--workers', type=int, default=2, help="工作线程数")
+    parser.add_argument('--queue-size', type=int, default=10000, help="消息队列容量")
+    parser.add_argument('--drop', action='store_true', help="队列满时丢弃消息而不是阻塞")
+    args = parser.parse_args()
+
+    sinks = [] if args.quiet else [StdoutSink()]
+    if args.file:
+        sinks.append(FileSink(args.file))
+    if args.sqlite:
+        sinks.append(SQLiteSink(args.sqlite))
+    if args.tsdb:
+        sinks.append(TimeSeriesSink(args.tsdb))
+
     print("茅台价格订阅器已启动")
-    print(f"订阅主题: {TOPIC}")
+    print(f"订阅主题: {TOPIC}/#")
     print(f"MQTT代理: {BROKER}:{PORT}")
     
-    subscribe_maotai_price()
\ No newline at end of file
+    subscribe_maotai_price(sinks, workers=args.workers, maxsize=args.queue_size, drop=args.drop)
\ No newline at end of file
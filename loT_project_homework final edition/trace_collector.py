@@ -0,0 +1,175 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+
+import paho.mqtt.client as mqtt
+
+from wire_format import BINARY_SUFFIX, decode_quote
+
+# 端到端延迟采集：订阅行情主题和设备回报主题，按序号把 上游收到 -> 发布 -> 采集端收到 / 设备显示 对齐
+# 按主题统计各段延迟的 p50/p99 以及序号缺口（丢消息）和重复、乱序
+# 消息带有发布者进程标识 epoch，发布者重启或股票迁移到其他分片后序号从 1 重新开始，按新的一段统计
+
+TOPIC = "sc104/maotai"
+TRACE_TOPIC = "sc104/esp32/trace"  # 设备 main2.py 在 MQTT_TRACE 开启时的回报主题
+MAX_SAMPLES = 10000  # 每段延迟保留的最近样本数
+MAX_PENDING = 1000  # 每个主题等待设备回报的消息数
+
+LEGS = (
+    ('upstream->publish', 't_recv', 't_pub'),
+    ('publish->collector', 't_pub', 't_col'),
+    ('publish->device', 't_pub', 't_dev'),
+    ('upstream->device', 't_recv', 't_dev'),
+)
+
+class SequenceTracker:
+    """检测序号缺口：第一条之前的不计，跳过的序号计为丢失，不大于上一条的计为重复或乱序；
+    epoch 变化时从新的序号重新开始，计为一次重置"""
+
+    def __init__(self):
+        self.epoch = None
+        self.last = None
+        self.received = 0
+        self.missing = 0
+        self.duplicates = 0
+        self.resets = 0
+
+    def add(self, seq, epoch=None):
+        self.received += 1
+        if epoch != self.epoch:
+            if self.last is not None:
+                self.resets += 1
+            self.epoch = epoch
+            self.last = None
+        if self.last is not None:
+            if seq <= self.last:
+                self.duplicates += 1
+                return
+            self.missing += seq - self.last - 1
+        self.last = seq
+
+class Stream:
+    """一个主题的消息流"""
+
+    def __init__(self):
+        self.published = SequenceTracker()  # 采集端收到的发布序号
+        self.device = SequenceTracker()  # 设备回报的序号
+        self.pending = {}  # (epoch, 序号) -> 时间戳，等待设备回报，按收到的顺序排列
+        self.samples = {name: deque(maxlen=MAX_SAMPLES) for name, _, _ in LEGS}
+
+    def record(self, stamps):
+        for name, start, end in LEGS:
+            if stamps.get(start) is not None and stamps.get(end) is not None:
+                self.samples[name].append(stamps[end] - stamps[start])
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+class TraceCollector:
+    def __init__(self):
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def stream(self, topic):
+        stream = self.streams.get(topic)
+        if stream is None:
+            stream = self.streams[topic] = Stream()
+        return stream
+
+    def on_message(self, client, userdata, msg):
+        now = time.time()
+        try:
+            if msg.topic == TRACE_TOPIC:
+                self.add_trace(json.loads(msg.payload))
+            elif msg.topic.endswith(BINARY_SUFFIX):
+                self.add_quote(msg.topic, decode_quote(msg.payload), now)
+            else:
+                self.add_quote(msg.topic, json.loads(msg.payload), now)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"无法解析 {msg.topic}: {e}")
+
+    def add_quote(self, topic, data, now):
+        seq = data.get('seq')
+        if seq is None:
+            return  # 指标、统计等不带序号的消息
+        stamps = {'t_recv': data.get('t_recv'), 't_pub': data.get('t_pub'), 't_col': now}
+        with self.lock:
+            stream = self.stream(topic)
+            stream.published.add(seq, data.get('epoch'))
+            stream.record(stamps)
+            stream.pending[data.get('epoch'), seq] = stamps
+            if len(stream.pending) > MAX_PENDING:
+                del stream.pending[next(iter(stream.pending))]
+
+    def add_trace(self, data):
+        with self.lock:
+            stream = self.stream(data['topic'])
+            stream.device.add(data['seq'], data.get('epoch'))
+            stamps = stream.pending.pop((data.get('epoch'), data['seq']), None)
+            if stamps is not None:
+                stream.record(dict(stamps, t_col=None, t_dev=data['t_dev'] / 1000))
+
+    def report(self):
+        """返回每个主题的统计，延迟单位为毫秒"""
+        result = {}
+        with self.lock:
+            for topic, stream in sorted(self.streams.items()):
+                entry = {
+                    'received': stream.published.received,
+                    'missing': stream.published.missing,
+                    'duplicates': stream.published.duplicates,
+                    'resets': stream.published.resets,
+                }
+                if stream.device.received:
+                    entry['device_received'] = stream.device.received
+                    entry['device_missing'] = stream.device.missing
+                for name, samples in stream.samples.items():
+                    if samples:
+                        entry[name] = {
+                            'p50_ms': round(percentile(samples, 50) * 1000, 1),
+                            'p99_ms': round(percentile(samples, 99) * 1000, 1),
+                        }
+                result[topic] = entry
+        return result
+
+    def print_report(self):
+        for topic, entry in self.report().items():
+            line = (f"[{topic}] 收到 {entry['received']} 丢失 {entry['missing']} "
+                    f"重复/乱序 {entry['duplicates']} 发布者重启 {entry['resets']}")
+            if 'device_received' in entry:
+                line += f" 设备收到 {entry['device_received']} 设备丢失 {entry['device_missing']}"
+            print(line)
+            for name, _, _ in LEGS:
+                if name in entry:
+                    print(f"    {name:<20} p50 {entry[name]['p50_ms']:>8.1f} ms  p99 {entry[name]['p99_ms']:>8.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="端到端延迟与丢消息统计")
+    parser.add_argument('--broker', default='127.0.0.1', help="MQTT 代理地址，默认本地代理")
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--interval', type=float, default=10, help="打印统计的间隔（秒）")
+    parser.add_argument('--duration', type=float, default=None, help="运行秒数，默认一直运行")
+    parser.add_argument('--json', action='store_true', help="结束时以 JSON 输出统计")
+    args = parser.parse_args()
+
+    collector = TraceCollector()
+    client = mqtt.Client(client_id="trace-collector")
+    client.on_connect = lambda c, userdata, flags, rc: c.subscribe([(TOPIC + "/#", 0), (TRACE_TOPIC, 0)])
+    client.on_message = collector.on_message
+    client.connect(args.broker, args.port)
+    client.loop_start()
+    print(f"正在采集 {args.broker}:{args.port} 上的 {TOPIC}/# 与 {TRACE_TOPIC}")
+    start = time.monotonic()
+    try:
+        while args.duration is None or time.monotonic() - start < args.duration:
+            time.sleep(min(args.interval, args.duration or args.interval))
+            collector.print_report()
+    except KeyboardInterrupt:
+        pass
+    client.loop_stop()
+    client.disconnect()
+    if args.json:
+        print(json.dumps(collector.report(), ensure_ascii=False, indent=2))
@@ -0,0 +1,199 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+
+# 本地时间序列存储：每只股票一个目录，每列一个内存映射文件，只追加写入
+# 列文件格式：8 字节头（已写入的元素个数）+ float64 数组，容量不足时按倍数扩展
+# 同时维护 1 分钟 / 5 分钟 / 1 小时的 OHLC 汇总，汇总同样按列存储
+
+HEADER = 8
+ITEM = 8  # float64
+RESOLUTIONS = (60, 300, 3600)
+TICK_COLUMNS = ('t', 'price')
+BAR_COLUMNS = ('t', 'open', 'high', 'low', 'close', 'count')
+
+class Column:
+    """内存映射的 float64 列"""
+
+    def __init__(self, path, capacity=4096):
+        exists = os.path.exists(path)
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self.file.write(bytes(HEADER))
+            self.file.flush()
+        size = os.path.getsize(path)
+        capacity = max(capacity, (size - HEADER) // ITEM)
+        self.map(capacity)
+        self.count = struct.unpack_from('<Q', self.mm, 0)[0]
+
+    def map(self, capacity):
+        self.file.truncate(HEADER + capacity * ITEM)
+        self.capacity = capacity
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.view = memoryview(self.mm)[HEADER:].cast('d')
+
+    def append(self, value):
+        if self.count == self.capacity:
+            # 扩容前必须释放对映射的引用
+            self.view.release()
+            self.mm.close()
+            self.map(self.capacity * 2)
+        self.view[self.count] = value
+        self.count += 1
+        struct.pack_into('<Q', self.mm, 0, self.count)
+
+    def slice(self, start, end):
+        """复制 [start, end) 区间，返回 array('d')，调用者持有期间不影响扩容"""
+        out = array('d')
+        with self.view[start:end] as chunk, chunk.cast('B') as raw:
+            out.frombytes(raw)
+        return out
+
+    def flush(self):
+        self.mm.flush()
+
+    def close(self):
+        self.view.release()
+        self.mm.close()
+        self.file.close()
+
+class Table:
+    """共享行数的一组列"""
+
+    def __init__(self, directory, prefix, names):
+        self.names = names
+        self.columns = [Column(os.path.join(directory, f"{prefix}{name}.f64")) for name in names]
+        # 写入中途退出时各列长度可能不同，以最短的列为准
+        self.count = min(column.count for column in self.columns)
+        for column in self.columns:
+            column.count = self.count
+
+    @property
+    def t(self):
+        return self.columns[0].view
+
+    def append(self, row):
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        self.count += 1
+
+    def search(self, start, end):
+        """按时间列二分查找 [start, end) 对应的行号区间"""
+        t = self.t
+        return bisect_left(t, start, 0, self.count), bisect_left(t, end, 0, self.count)
+
+    def rows(self, start, end):
+        lo, hi = self.search(start, end)
+        return [column.slice(lo, hi) for column in self.columns]
+
+    def flush(self):
+        for column in self.columns:
+            column.flush()
+
+    def close(self):
+        for column in self.columns:
+            column.close()
+
+class Series:
+    """一只股票的逐笔数据与各周期的 OHLC 汇总"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.ticks = Table(directory, 'tick_', TICK_COLUMNS)
+        self.bars = {res: Table(directory, f'bar{res}_', BAR_COLUMNS) for res in RESOLUTIONS}
+        self.open_bars = {}
+        for res, table in self.bars.items():
+            # 重新打开时，用最后一根已完成 K 线之后的逐笔数据恢复未完成的 K 线
+            since = table.t[table.count - 1] + res if table.count else float('-inf')
+            t = self.ticks.t
+            for i in range(bisect_left(t, since, 0, self.ticks.count), self.ticks.count):
+                self.update_bar(res, t[i], self.ticks.columns[1].view[i])
+
+    @property
+    def last_time(self):
+        count = self.ticks.count
+        return self.ticks.t[count - 1] if count else float('-inf')
+
+    def update_bar(self, res, ts, price):
+        start = ts - ts % res
+        bar = self.open_bars.get(res)
+        if bar is not None and bar[0] != start:
+            self.bars[res].append(bar)
+            bar = None
+        if bar is None:
+            self.open_bars[res] = [start, price, price, price, price, 1]
+            return
+        if price > bar[2]:
+            bar[2] = price
+        if price < bar[3]:
+            bar[3] = price
+        bar[4] = price
+        bar[5] += 1
+
+    def append(self, ts, price):
+        self.ticks.append((ts, price))
+        for res in RESOLUTIONS:
+            self.update_bar(res, ts, price)
+
+    def close(self):
+        self.ticks.close()
+        for table in self.bars.values():
+            table.close()
+
+class TimeSeriesStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.series = {}
+        self.lock = threading.Lock()
+        self.out_of_order = 0  # 因时间早于已有数据而丢弃的条数
+
+    def get_series(self, symbol):
+        series = self.series.get(symbol)
+        if series is None:
+            # 符号中可能带有 '/'（例如直接使用主题），目录名中替换掉
+            series = Series(os.path.join(self.root, symbol.replace('/', '_')))
+            self.series[symbol] = series
+        return series
+
+    def append(self, symbol, ts, price):
+        """追加一条逐笔数据，时间必须不早于该股票已有的最后一条，否则丢弃并返回 False"""
+        with self.lock:
+            series = self.get_series(symbol)
+            if ts < series.last_time:
+                self.out_of_order += 1
+                return False
+            series.append(ts, price)
+            return True
+
+    def range(self, symbol, start, end):
+        """查询 [start, end) 内的逐笔数据，返回 (时间数组, 价格数组)"""
+        with self.lock:
+            return tuple(self.get_series(symbol).ticks.rows(start, end))
+
+    def ohlc(self, symbol, resolution, start, end):
+        """查询 [start, end) 内的 K 线，返回 (t, open, high, low, close, count) 列表，包含未完成的 K 线"""
+        with self.lock:
+            series = self.get_series(symbol)
+            columns = series.bars[resolution].rows(start, end)
+            bars = [tuple(row) for row in zip(*columns)]
+            bar = series.open_bars.get(resolution)
+            if bar is not None and start <= bar[0] < end:
+                bars.append(tuple(bar))
+            return bars
+
+    def flush(self):
+        with self.lock:
+            for series in self.series.values():
+                series.ticks.flush()
+                for table in series.bars.values():
+                    table.flush()
+
+    def close(self):
+        with self.lock:
+            for series in self.series.values():
+                series.close()
+            self.series = {}
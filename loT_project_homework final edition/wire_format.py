@@ -0,0 +1,87 @@
+# 行情消息的紧凑二进制格式，发布者、订阅者与 ESP32 共用
+# 只使用 struct，保证 CPython 与 MicroPython 都能直接导入
+
+import struct
+
+# 版本、市场、代码、最新价、涨跌额、涨跌幅、发布时间（秒），大端共 20 字节
+QUOTE_FORMAT_V1 = '>BBIiihI'
+# 第 2 版在末尾增加发布时间的毫秒部分、距上游收到数据的毫秒数和序号，共 28 字节
+QUOTE_FORMAT_V2 = '>BBIiihIHHI'
+# 第 3 版在末尾增加发布者进程标识 epoch，序号在 epoch 变化时重新开始，共 32 字节
+QUOTE_FORMAT = '>BBIiihIHHII'
+QUOTE_SIZE_V1 = struct.calcsize(QUOTE_FORMAT_V1)
+QUOTE_SIZE_V2 = struct.calcsize(QUOTE_FORMAT_V2)
+QUOTE_SIZE = struct.calcsize(QUOTE_FORMAT)
+VERSION = 3
+
+PRICE_SCALE = 1000  # 价格与涨跌额保留 3 位小数
+PERCENT_SCALE = 100  # 涨跌幅保留 2 位小数
+
+# 二进制消息发布在 JSON 主题的平行子主题上
+BINARY_SUFFIX = '/bin'
+
+# MicroPython 在 ESP32 上的纪元是 2000-01-01，与 Unix 纪元相差的秒数
+EPOCH_2000_OFFSET = 946684800
+
+
+def _check(name, value, low, high):
+    # struct 在 CPython 上超出范围抛出 struct.error，在 MicroPython 上则静默截断，统一先检查
+    if not low <= value <= high:
+        raise ValueError('%s out of range: %s' % (name, value))
+    return value
+
+
+def encode_quote(data, timestamp):
+    """把解析后的行情编码为定长二进制，timestamp 为发布时间（Unix 秒，可带小数），
+    缺少代码、代码不是纯数字或字段超出格式范围时抛出异常"""
+    if data.get('latest_price') is None:
+        raise ValueError('latest_price missing')  # 停牌等没有价格的行情不能编码
+    market = data.get('market')
+    if market is None:
+        market = int(data.get('secid', '1.0').split('.')[0])
+    seconds = int(timestamp)
+    recv_age = int((timestamp - data.get('t_recv', timestamp)) * 1000)
+    return struct.pack(
+        QUOTE_FORMAT,
+        VERSION,
+        _check('market', int(market), 0, 0xff),
+        _check('code', int(data['code']), 0, 0xffffffff),
+        _check('latest_price', int(round(data['latest_price'] * PRICE_SCALE)), -0x80000000, 0x7fffffff),
+        _check('change_amount', int(round((data.get('change_amount') or 0) * PRICE_SCALE)), -0x80000000, 0x7fffffff),
+        _check('change_percent', int(round((data.get('change_percent') or 0) * PERCENT_SCALE)), -0x8000, 0x7fff),
+        _check('timestamp', seconds, 0, 0xffffffff),
+        int((timestamp - seconds) * 1000),
+        min(max(recv_age, 0), 0xffff),
+        _check('seq', data.get('seq', 0), 0, 0xffffffff),
+        _check('epoch', data.get('epoch', 0), 0, 0xffffffff),
+    )
+
+
+def decode_quote(payload):
+    """解码二进制行情，返回与 JSON 消息字段一致的字典，兼容第 1、2 版"""
+    if len(payload) == QUOTE_SIZE:
+        expected, fields = VERSION, struct.unpack(QUOTE_FORMAT, payload)
+    elif len(payload) == QUOTE_SIZE_V2:
+        expected, fields = 2, struct.unpack(QUOTE_FORMAT_V2, payload) + (None,)
+    elif len(payload) == QUOTE_SIZE_V1:
+        expected, fields = 1, struct.unpack(QUOTE_FORMAT_V1, payload) + (0, 0, None, None)
+    else:
+        raise ValueError('bad quote size')
+    version, market, code, price, change, percent, timestamp, ms, recv_age, seq, epoch = fields
+    if version != expected:
+        raise ValueError('unsupported version')
+    quote = {
+        'secid': '%d.%06d' % (market, code),
+        'code': '%06d' % code,
+        'latest_price': price / PRICE_SCALE,
+        'change_amount': change / PRICE_SCALE,
+        'change_percent': percent / PERCENT_SCALE,
+        'timestamp': timestamp,  # Unix 秒
+    }
+    if seq is not None:
+        quote['seq'] = seq
+        if epoch is not None:
+            quote['epoch'] = epoch
+        quote['t_pub'] = timestamp + ms / 1000
+        quote['t_recv'] = quote['t_pub'] - recv_age / 1000
+    return quote